@@ -3,49 +3,58 @@ __code_version__ = 'v0.0.1'
 __code_debug__ = False
 
 import argparse
-import ollama
+
+from prompt_prefix import PrefixSession, RoutedSessions
 
 MODEL = "llama3.1"
 SPINNER_STOP = False
+INSTRUCTIONS = """Explain the following End User License Agreement in plain English.
+List the important rights, restrictions, and obligations in bullet points. Be concise and clear."""
 
 def read_eula(file_path):
     with open(file_path, 'r', encoding='utf-8') as f:
         return f.read()
 
-def explain_eula_stream(text, model=MODEL):
-    prompt = f"""Explain the following End User License Agreement in plain English.
-List the important rights, restrictions, and obligations in bullet points. Be concise and clear.
-
-EULA:
-{text[:8000]}"""
+def new_session(model=MODEL):
+    return PrefixSession(model, INSTRUCTIONS, "EULA")
 
+def explain_eula_stream(text, model=MODEL, session=None, name=None):
+    session = session or new_session(model)
     try:
-        stream = ollama.chat(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            stream=True
-        )
+        stream = session.stream(text[:8000], name)
         print("\n📜 Plain English Summary:\n")
-        for chunk in stream:
-            print(chunk['message']['content'], end='', flush=True)
+        for piece in stream:
+            print(piece, end='', flush=True)
 
     except Exception as e:
         print(f"\n❌ Error: {e}")
 
 def main():
     parser = argparse.ArgumentParser(description=__code_desc__)
-    parser.add_argument("eula_file", help="Path to the EULA text file")
-    parser.add_argument("-m", "--model", default=MODEL, help=f"Ollama model to use (default: {MODEL})")
+    parser.add_argument("eula_files", nargs="+", help="Path to one or more EULA text files")
+    parser.add_argument("-m", "--model", help=f"Ollama model to use (default: routed by model_router.py, else {MODEL})")
+    parser.add_argument("--max-latency", type=float, help="Route to a model predicted to answer within this many seconds")
+    parser.add_argument("--min-tps", type=float, help="Route to a model generating at least this many tokens/s")
     parser.add_argument("-v", "--version", action="version", version=f"%(prog)s {__code_version__}")
     args = parser.parse_args()
 
-    try:
-        eula_text = read_eula(args.eula_file)
-        explain_eula_stream(eula_text, model=args.model)
-    except FileNotFoundError:
-        print(f"❌ File not found: {args.eula_file}")
-    except Exception as e:
-        print(f"❌ Failed to process EULA: {e}")
+    batch = len(args.eula_files) > 1
+    session = RoutedSessions("eula", INSTRUCTIONS, "EULA", model=args.model,
+                             max_seconds=args.max_latency, min_tps=args.min_tps, warm=batch)
+
+    for eula_file in args.eula_files:
+        if batch:
+            print(f"\n📄 {eula_file}")
+        try:
+            eula_text = read_eula(eula_file)
+            explain_eula_stream(eula_text, session=session, name=eula_file)
+        except FileNotFoundError:
+            print(f"❌ File not found: {eula_file}")
+        except Exception as e:
+            print(f"❌ Failed to process EULA: {e}")
+
+    if batch:
+        print("\n\n" + session.report())
 
 if __name__ == "__main__":
     main()
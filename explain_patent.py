@@ -3,16 +3,33 @@ __code_version__ = 'v0.0.1'
 __code_debug__ = False
 
 import argparse
-import ollama
+import contextlib
+import io
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
-import fitz  # PyMuPDF
-from pdf2image import convert_from_path
-import pytesseract
+import patent_sections
+from prompt_prefix import PrefixSession, RoutedSessions
+
+# ollama, fitz (PyMuPDF), pdf2image and pytesseract are imported where they're
+# used so --help and --version don't pay for them
 
 MODEL = "llama3.1"
+PROMPT_TOKENS = 2000  # budget for the patent text in the prompt
 SPINNER_STOP = False
+INSTRUCTIONS = "Explain the following patent in plain English."
+QUEUE_SIZE = 2  # extracted patents waiting for the model before extraction pauses
 
 def ocr_pdf(filename):
+    from pdf2image import convert_from_path
+    import pytesseract
+
     print("🔍 Running OCR on scanned or encoded PDF...")
     images = convert_from_path(filename)
     text = ""
@@ -22,6 +39,8 @@ def ocr_pdf(filename):
     return text
 
 def extract_text_from_pdf(filename):
+    import fitz  # PyMuPDF
+
     try:
         doc = fitz.open(filename)
         text = "\n".join(page.get_text() for page in doc)
@@ -33,39 +52,194 @@ def extract_text_from_pdf(filename):
     # If no text, fall back to OCR
     return ocr_pdf(filename)
 
-def simplify_patent_text(text, model):
-    prompt = f"""Explain the following patent in plain English.
+def load_index(filename, use_cache=True):
+    """Section index for `filename`, cached by file hash so re-runs skip extraction and OCR."""
+    digest = patent_sections.file_digest(filename)
+    if use_cache:
+        index = patent_sections.load_cached_index(digest)
+        if index is not None:
+            print("🗂️  Using cached section index.")
+            return index
 
-Patent:
-{text[:8000]}"""  # Truncate for prompt length safety
+    text = extract_text_from_pdf(filename)
+    if not text.strip():
+        return None
+    index = patent_sections.index_sections(text)
+    if use_cache:
+        patent_sections.save_cached_index(digest, index)
+    return index
 
+def new_session(model=MODEL):
+    return PrefixSession(model, INSTRUCTIONS, "Patent")
+
+def simplify_patent_text(text, model=MODEL, budget=PROMPT_TOKENS, session=None, name=None):
+    session = session or new_session(model)
     try:
-        stream = ollama.chat(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            stream=True
-        )
+        stream = session.stream(text[:budget * 4], name)  # Truncate for prompt length safety
 
         print("\n📜 Plain English Summary:\n")
-        for chunk in stream:
-            print(chunk['message']['content'], end='', flush=True)
+        for piece in stream:
+            print(piece, end='', flush=True)
 
     except Exception as e:
         print(f"\n❌ Error while simplifying: {e}")
 
+# === Batch pipeline ===
+# Extraction/OCR runs on CPU worker processes while the model summarizes the
+# previous patent. Extracted patents wait in a bounded queue; when it is full
+# the feeder stops submitting, so a slow model never piles up extracted text.
+def find_pdfs(directory):
+    paths = []
+    for root, _, files in os.walk(directory):
+        paths.extend(os.path.join(root, name) for name in files if name.lower().endswith(".pdf"))
+    return sorted(paths)
+
+def _extract_job(path, use_cache):
+    # Runs in a worker; its progress prints would interleave with the summaries
+    started = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            index = load_index(path, use_cache)
+        error = None if index is not None else "no readable text"
+    except Exception as e:
+        index, error = None, f"{type(e).__name__}: {e}"
+    return {"path": path, "index": index, "error": error, "seconds": time.perf_counter() - started}
+
+def _feed(paths, use_cache, workers, ready, stats):
+    """Submit extraction jobs with at most `workers` in flight; put results on `ready` in order.
+
+    A dead worker (OCR out of memory, a crash in fitz) breaks the pool; that is
+    handed on as an error result and the sentinel still goes out, so the model
+    stage reports it and the run ends instead of waiting forever.
+    """
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for path in paths:
+                pending.append((path, pool.submit(_extract_job, path, use_cache)))
+                if len(pending) >= workers:
+                    _hand_off(*pending.popleft(), ready, stats)
+            while pending:
+                _hand_off(*pending.popleft(), ready, stats)
+    except BrokenProcessPool:
+        pass  # already handed on by _hand_off
+    except Exception as e:
+        ready.put({"path": "extraction pool", "index": None, "error": f"{type(e).__name__}: {e}",
+                   "seconds": 0.0, "fatal": True})
+    finally:
+        ready.put(None)
+
+def _hand_off(path, future, ready, stats):
+    try:
+        result = future.result()
+    except BrokenProcessPool as e:
+        # A worker died and the pool is unusable; let _feed stop the run
+        ready.put({"path": path, "index": None, "error": f"extraction pool broke (a worker died): {e}", "seconds": 0.0,
+                   "fatal": True})
+        raise
+    stats["extract_busy"] += result["seconds"]
+    blocked = time.perf_counter()
+    ready.put(result)  # blocks while the model stage is behind
+    stats["extract_blocked"] += time.perf_counter() - blocked
+
+def run_batch(directory, session, budget, workers, queue_size=QUEUE_SIZE, use_cache=True, sections=False):
+    paths = find_pdfs(directory)
+    if not paths:
+        print(f"❗ No PDFs found in {directory}.")
+        return True
+    workers = max(1, min(workers, len(paths)))
+    print(f"📚 {len(paths)} patents, {workers} extraction workers, queue of {queue_size}")
+
+    stats = {"extract_busy": 0.0, "extract_blocked": 0.0, "model_busy": 0.0, "model_starved": 0.0}
+    ready = queue.Queue(maxsize=queue_size)
+    started = time.perf_counter()
+    feeder = threading.Thread(target=_feed, args=(paths, use_cache, workers, ready, stats), daemon=True)
+    feeder.start()
+
+    done = failed = 0
+    aborted = False
+    while True:
+        waited = time.perf_counter()
+        result = ready.get()
+        stats["model_starved"] += time.perf_counter() - waited
+        if result is None:
+            break
+        print(f"\n📄 {result['path']} (extracted in {result['seconds']:.1f}s)")
+        if result["error"]:
+            failed += 1
+            print(f"❌ {result['error']}")
+            if result.get("fatal"):
+                aborted = True
+                print("❌ Extraction stopped; remaining patents were not processed.")
+            continue
+        busy = time.perf_counter()
+        if sections:
+            print(patent_sections.describe(result["index"]))
+        else:
+            text = patent_sections.build_prompt_text(result["index"], budget)
+            simplify_patent_text(text, budget=budget, session=session, name=os.path.basename(result["path"]))
+            print()
+        stats["model_busy"] += time.perf_counter() - busy
+        done += 1
+    feeder.join()
+    elapsed = time.perf_counter() - started
+
+    print(f"\n✅ {done} summarized, {failed} failed in {elapsed:.1f}s")
+    print(pipeline_report(stats, elapsed, workers))
+    if session.calls:
+        print(session.report())
+    return not aborted
+
+def pipeline_report(stats, elapsed, workers):
+    """Per-stage utilization; the stage closest to 100% is the bottleneck."""
+    if not elapsed:
+        return ""
+    extract = stats["extract_busy"] / (elapsed * workers)
+    model = stats["model_busy"] / elapsed
+    bottleneck = "model" if model >= extract else "extraction"
+    return "\n".join([
+        "📊 Pipeline utilization",
+        f"   extraction (CPU, {workers} workers): {extract:>6.1%} busy, {stats['extract_blocked']:.1f}s blocked on a full queue",
+        f"   model (GPU):                 {model:>6.1%} busy, {stats['model_starved']:.1f}s waiting for extraction",
+        f"   bottleneck: {bottleneck}",
+    ])
+
 def main():
     parser = argparse.ArgumentParser(description="Summarize patent PDF text using Ollama.")
-    parser.add_argument("filename", help="Path to the patent PDF file")
-    parser.add_argument("-m", "--model", default=MODEL, help=f"Ollama model to use (default: {MODEL})")
+    parser.add_argument("filename", help="Path to the patent PDF file, or a directory of them for a batch run")
+    parser.add_argument("-m", "--model", help=f"Ollama model to use (default: routed by model_router.py, else {MODEL})")
+    parser.add_argument("--max-latency", type=float, help="Route to a model predicted to answer within this many seconds")
+    parser.add_argument("--min-tps", type=float, help="Route to a model generating at least this many tokens/s")
+    parser.add_argument("-b", "--budget", type=int, default=PROMPT_TOKENS, help=f"Prompt token budget for patent text (default: {PROMPT_TOKENS})")
+    parser.add_argument("--sections", action="store_true", help="Print the section index and exit")
+    parser.add_argument("--no-cache", action="store_true", help="Re-extract instead of using the cached section index")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(), help="Extraction/OCR processes in batch mode (default: all cores)")
+    parser.add_argument("--queue", type=int, default=QUEUE_SIZE, help=f"Extracted patents buffered ahead of the model in batch mode (default: {QUEUE_SIZE})")
     args = parser.parse_args()
 
+    batch = os.path.isdir(args.filename)
+    session = RoutedSessions("patent", INSTRUCTIONS, "Patent", model=args.model,
+                             max_seconds=args.max_latency, min_tps=args.min_tps, warm=batch and not args.sections)
+    if batch:
+        completed = run_batch(args.filename, session, args.budget, args.workers, max(args.queue, 1),
+                              use_cache=not args.no_cache, sections=args.sections)
+        if not completed:
+            sys.exit(1)
+        return
+
     print(f"📄 Reading patent from {args.filename}...")
-    text = extract_text_from_pdf(args.filename)
-    if not text.strip():
+    index = load_index(args.filename, use_cache=not args.no_cache)
+    if index is None:
         print("❗ No readable text found in PDF.")
         return
 
-    simplify_patent_text(text, args.model)
+    if args.sections:
+        print(patent_sections.describe(index))
+        return
+
+    text = patent_sections.build_prompt_text(index, args.budget)
+    print(f"🧩 Prompt uses ~{patent_sections.estimate_tokens(text)} of {args.budget} budgeted tokens.")
+    simplify_patent_text(text, budget=args.budget, session=session)
 
 if __name__ == "__main__":
     main()
@@ -1,5 +1,5 @@
 import hashlib
- 
+
 # ====== INPUT VALUES FROM AI ======
 random_number = 123456789
 epoch_time = 123456789
@@ -9,12 +9,15 @@ entropy_bytes = "placeholder"
 fingerprint = "placeholder"
 
 # ====== RECOMPUTE FINGERPRINT ======
-combined = f"{random_number}-{epoch_time}-{user}-{cwd}-{entropy_bytes}"
-expected_fingerprint = hashlib.sha256(combined.encode()).hexdigest()
- 
+def expected_fingerprint(random_number, epoch_time, user, cwd, entropy_bytes):
+    combined = f"{random_number}-{epoch_time}-{user}-{cwd}-{entropy_bytes}"
+    return hashlib.sha256(combined.encode()).hexdigest()
+
 # ====== CHECK ======
-if expected_fingerprint == fingerprint:
-    print("✅ Fingerprint matches! Output is internally consistent.")
-else:
-    print("❌ Fingerprint mismatch! Output may not be genuine.")
-print("Expected fingerprint:", expected_fingerprint)
+if __name__ == "__main__":
+    expected = expected_fingerprint(random_number, epoch_time, user, cwd, entropy_bytes)
+    if expected == fingerprint:
+        print("✅ Fingerprint matches! Output is internally consistent.")
+    else:
+        print("❌ Fingerprint mismatch! Output may not be genuine.")
+    print("Expected fingerprint:", expected)
@@ -0,0 +1,205 @@
+__code_desc__ = "Generate and verify litmus probes in bulk, in parallel across cores"
+__code_version__ = 'v0.0.1'
+__code_debug__ = False
+
+## Standard Libraries
+import argparse
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from collections import deque
+from multiprocessing import Pool
+
+from litmus_1test import generate_probe
+from litmus_2check import expected_fingerprint
+
+FIELDS = ("random_number", "epoch_time", "user", "cwd", "entropy_bytes", "fingerprint")
+KNOWN_KEYS = set(FIELDS) | {"pickle_sha1"}
+BATCH_SIZE = 2048  # records per worker task; keeps IPC cost small next to hashing
+
+
+# === Reading ===
+def parse_records(lines):
+    """Yield probe dicts from JSONL or the `key: value` output of litmus_1test/litmus_pickle.
+
+    Key/value records end at a blank line or when a key repeats. A JSON line
+    that doesn't parse to an object is yielded as a malformed record.
+    """
+    record = {}
+    for line in lines:
+        line = line.strip()
+        if not line:
+            if record:
+                yield record
+                record = {}
+            continue
+        if line.startswith(("{", "[")):
+            if record:
+                yield record
+                record = {}
+            try:
+                parsed = json.loads(line)
+            except json.JSONDecodeError:
+                parsed = None
+            yield parsed if isinstance(parsed, dict) else {"_malformed": line[:80]}
+            continue
+        key, sep, value = line.partition(": ")
+        if not sep or key not in KNOWN_KEYS:
+            continue
+        if key in record:
+            yield record
+            record = {}
+        record[key] = value
+    if record:
+        yield record
+
+
+def read_inputs(paths):
+    for path in paths:
+        if path == "-":
+            yield from sys.stdin
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                yield from f
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+# === Verification ===
+def verify_batch(records):
+    """Return (status, expected) per record; status is "pass", "fail" or "malformed"."""
+    results = []
+    for record in records:
+        if any(field not in record for field in FIELDS):
+            results.append(("malformed", None))
+            continue
+        expected = expected_fingerprint(
+            record["random_number"], record["epoch_time"], record["user"],
+            record["cwd"], record["entropy_bytes"],
+        )
+        results.append(("pass" if expected == record["fingerprint"] else "fail", expected))
+    return results
+
+
+def map_batches(fn, batches, workers):
+    """Yield (batch, fn(batch)) in input order; runs inline when workers == 1.
+
+    At most two batches per worker are in flight, so memory stays bounded
+    however large the input is.
+    """
+    if workers == 1:
+        for batch in batches:
+            yield batch, fn(batch)
+        return
+    with Pool(workers) as pool:
+        pending = deque()
+        for batch in batches:
+            pending.append((batch, pool.apply_async(fn, (batch,))))
+            if len(pending) >= workers * 2:
+                done, result = pending.popleft()
+                yield done, result.get()
+        while pending:
+            done, result = pending.popleft()
+            yield done, result.get()
+
+
+def verify(paths, workers, show_passes=False):
+    counts = {"pass": 0, "fail": 0, "malformed": 0}
+    started = time.perf_counter()
+    batches = batched(parse_records(read_inputs(paths)), BATCH_SIZE)
+
+    index = 0
+    for records, results in map_batches(verify_batch, batches, workers):
+        for record, (status, expected) in zip(records, results):
+            index += 1
+            counts[status] += 1
+            if status == "fail":
+                print(f"❌ #{index} fingerprint {record['fingerprint']} != expected {expected}")
+            elif status == "malformed":
+                if "_malformed" in record:
+                    print(f"⚠️ #{index} malformed probe (unparseable: {record['_malformed']})")
+                else:
+                    missing = [f for f in FIELDS if f not in record]
+                    print(f"⚠️ #{index} malformed probe (missing: {', '.join(missing)})")
+            elif show_passes:
+                print(f"✅ #{index} {expected}")
+
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    print("\n📊 Verification summary")
+    print(f"   probes:    {total}")
+    print(f"   passed:    {counts['pass']}")
+    print(f"   failed:    {counts['fail']}")
+    print(f"   malformed: {counts['malformed']}")
+    if total:
+        print(f"   pass rate: {counts['pass'] / total:.2%}")
+    print(f"   elapsed:   {elapsed:.2f}s ({total / elapsed if elapsed else 0:,.0f} probes/s, {workers} workers)")
+    return counts
+
+
+# === Generation ===
+def generate_batch(args):
+    count, tamper_rate = args
+    probes = []
+    for _ in range(count):
+        probe = generate_probe()
+        if tamper_rate and random.random() < tamper_rate:
+            probe["fingerprint"] = probe["fingerprint"][::-1]
+        probes.append(probe)
+    return probes
+
+
+def format_probe(probe, fmt):
+    if fmt == "jsonl":
+        return json.dumps(probe)
+    return "\n".join(f"{k}: {v}" for k, v in probe.items()) + "\n"
+
+
+def generate(count, workers, fmt, tamper_rate=0.0):
+    sizes = [BATCH_SIZE] * (count // BATCH_SIZE)
+    if count % BATCH_SIZE:
+        sizes.append(count % BATCH_SIZE)
+    out = sys.stdout
+    for _, probes in map_batches(generate_batch, ((n, tamper_rate) for n in sizes), workers):
+        out.write("\n".join(format_probe(p, fmt) for p in probes) + "\n")
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description=__code_desc__)
+    parser.add_argument("-v", "--version", action="version", version=f"%(prog)s {__code_version__}")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    check = sub.add_parser("verify", help="Verify probe records from files or stdin")
+    check.add_argument("inputs", nargs="*", default=["-"], help="JSONL or key: value probe files (default: stdin)")
+    check.add_argument("-w", "--workers", type=int, default=os.cpu_count(), help="Worker processes (default: all cores)")
+    check.add_argument("--show-passes", action="store_true", help="Report passing probes too")
+
+    gen = sub.add_parser("generate", help="Emit a batch of fresh probes to stdout")
+    gen.add_argument("-n", "--count", type=int, default=1000, help="Probes to generate (default: 1000)")
+    gen.add_argument("-w", "--workers", type=int, default=os.cpu_count(), help="Worker processes (default: all cores)")
+    gen.add_argument("-f", "--format", choices=("jsonl", "kv"), default="jsonl", help="Output format (default: jsonl)")
+    gen.add_argument("--tamper-rate", type=float, default=0.0, help="Fraction of probes with a corrupted fingerprint")
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    if args.command == "generate":
+        generate(args.count, args.workers, args.format, args.tamper_rate)
+        return
+    counts = verify(args.inputs, args.workers, args.show_passes)
+    if not any(counts.values()):
+        print("❌ No probes found in the input")
+        sys.exit(1)
+    sys.exit(1 if counts["fail"] or counts["malformed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -18,8 +18,11 @@ def make_probe(pickle_path=None):
     fingerprint = hashlib_mod.sha256(combined.encode()).hexdigest()
     pickle_sha1 = None
     if pickle_path:
+        sha1 = hashlib_mod.sha1()
         with open(pickle_path, "rb") as f:
-            pickle_sha1 = hashlib_mod.sha1(f.read()).hexdigest()
+            while chunk := f.read(1 << 20):
+                sha1.update(chunk)
+        pickle_sha1 = sha1.hexdigest()
 
     probe = {
         "random_number": rand_num,
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+__code_desc__ = "Scan pickle and model files for code-executing imports without loading them"
+__code_version__ = 'v0.0.1'
+__code_debug__ = False
+
+## Standard Libraries
+import argparse
+import fnmatch
+import hashlib
+import io
+import json
+import mmap
+import os
+import pickle
+import pickletools
+import sys
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+CHUNK_SIZE = 1 << 20  # 1 MiB reads keep memory flat regardless of file size
+PICKLE_PATTERNS = ("*.pkl", "*.pickle", "*.pt", "*.pth", "*.bin", "*.ckpt", "*.joblib", "*.dat")
+
+# Globals that reconstruct plain data. Anything else reachable through
+# GLOBAL/STACK_GLOBAL can run code when the pickle is loaded (see litmus_pickle.py).
+SAFE_GLOBALS = {
+    "builtins.set", "builtins.frozenset", "builtins.slice", "builtins.range",
+    "builtins.complex", "builtins.bytearray", "builtins.bytes", "builtins.object",
+    "__builtin__.set", "__builtin__.frozenset", "__builtin__.slice", "__builtin__.complex",
+    "copy_reg._reconstructor", "copyreg._reconstructor",
+    "collections.OrderedDict", "collections.defaultdict", "collections.deque", "collections.Counter",
+    "datetime.datetime", "datetime.date", "datetime.time", "datetime.timedelta", "datetime.timezone",
+    "decimal.Decimal", "fractions.Fraction", "uuid.UUID", "pathlib.PosixPath", "pathlib.WindowsPath",
+    "_codecs.encode",
+    "numpy.ndarray", "numpy.dtype", "numpy.core.multiarray._reconstruct",
+    "numpy.core.multiarray.scalar", "numpy._core.multiarray._reconstruct",
+    "numpy._core.multiarray.scalar",
+    "torch._utils._rebuild_tensor_v2", "torch._utils._rebuild_parameter",
+    "torch.*Storage", "torch.storage._load_from_bytes", "torch.Size", "torch.device",
+}
+
+STRING_OPS = {
+    "STRING", "BINSTRING", "SHORT_BINSTRING", "UNICODE", "BINUNICODE",
+    "SHORT_BINUNICODE", "BINUNICODE8",
+}
+PUT_OPS = {"PUT", "BINPUT", "LONG_BINPUT"}
+GET_OPS = {"GET", "BINGET", "LONG_BINGET"}
+CALL_OPS = {"REDUCE", "INST", "OBJ", "NEWOBJ", "NEWOBJ_EX", "BUILD"}
+IMPORT_OPS = {"GLOBAL", "INST"}         # "module name" argument, resolved through find_class
+EXT_OPS = {"EXT1", "EXT2", "EXT4"}      # copyreg extension codes, also resolved through find_class
+ZIP_MAGIC = b"PK\x03\x04"
+
+
+def is_allowed(ref, allowlist):
+    return any(fnmatch.fnmatchcase(ref, pattern) for pattern in allowlist)
+
+
+# === Hashing ===
+class HashingReader:
+    """File wrapper that hashes bytes as pickletools consumes them, so one pass does both."""
+
+    def __init__(self, f):
+        self.f = f
+        self.sha1 = hashlib.sha1()
+        self.sha256 = hashlib.sha256()
+
+    def _update(self, data):
+        self.sha1.update(data)
+        self.sha256.update(data)
+        return data
+
+    def read(self, n=-1):
+        return self._update(self.f.read(n))
+
+    def readline(self):
+        return self._update(self.f.readline())
+
+    def drain(self):
+        # Hash anything after the pickle's STOP opcode
+        while chunk := self.f.read(CHUNK_SIZE):
+            self._update(chunk)
+
+
+def hash_file(path, use_mmap=False):
+    sha1, sha256 = hashlib.sha1(), hashlib.sha256()
+    with open(path, "rb") as f:
+        if use_mmap and os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                sha1.update(mm)
+                sha256.update(mm)
+        else:
+            while chunk := f.read(CHUNK_SIZE):
+                sha1.update(chunk)
+                sha256.update(chunk)
+    return sha1.hexdigest(), sha256.hexdigest()
+
+
+# === Opcode walk ===
+class PushbackReader:
+    """read/readline wrapper that can put one peeked chunk back, to test for EOF between pickles."""
+
+    def __init__(self, f):
+        self.f = f
+        self.head = b""
+
+    def unread(self, data):
+        self.head = data + self.head
+
+    def read(self, n=-1):
+        if not self.head:
+            return self.f.read(n)
+        if n < 0:
+            data, self.head = self.head + self.f.read(), b""
+            return data
+        data, self.head = self.head[:n], self.head[n:]
+        return data + self.f.read(n - len(data)) if len(data) < n else data
+
+    def readline(self):
+        if not self.head:
+            return self.f.readline()
+        newline = self.head.find(b"\n")
+        if newline >= 0:
+            data, self.head = self.head[:newline + 1], self.head[newline + 1:]
+            return data
+        data, self.head = self.head, b""
+        return data + self.f.readline()
+
+
+def scan_stream(f, allowlist):
+    """Walk the opcodes of every pickle in `f`, back to back until EOF, without executing anything.
+
+    Legacy torch files (and anything written by repeated pickle.dump) hold
+    several pickles in a row, and each one is loaded. Raises if the first
+    pickle doesn't parse; bytes after a complete pickle that don't parse are
+    reported in "trailing".
+    """
+    f = PushbackReader(f)
+    imports = []
+    calls = 0
+    opcodes = 0
+    pickles = 0
+    trailing = None
+
+    while True:
+        if pickles:
+            head = f.read(1)
+            if not head:
+                break
+            f.unread(head)
+        memo = {}                  # each pickle.load starts with an empty memo
+        recent = deque(maxlen=2)   # last strings pushed, for STACK_GLOBAL
+        try:
+            for opcode, arg, pos in pickletools.genops(f):
+                opcodes += 1
+                name = opcode.name
+                if name in STRING_OPS:
+                    recent.append(arg)
+                elif name in PUT_OPS:
+                    memo[arg] = recent[-1] if recent else None
+                elif name == "MEMOIZE":
+                    memo[len(memo)] = recent[-1] if recent else None
+                elif name in GET_OPS:
+                    recent.append(memo.get(arg))
+                elif name in IMPORT_OPS:
+                    module, _, attr = arg.partition(" ")
+                    imports.append((f"{module}.{attr}", pos))
+                    calls += name == "INST"  # INST imports and calls in one opcode
+                elif name in EXT_OPS:
+                    imports.append((f"<unresolved {name} {arg}>", pos))
+                elif name == "STACK_GLOBAL":
+                    if len(recent) == 2 and all(isinstance(s, str) for s in recent):
+                        imports.append((f"{recent[0]}.{recent[1]}", pos))
+                    else:
+                        imports.append(("<unresolved STACK_GLOBAL>", pos))
+                elif name in CALL_OPS:
+                    calls += 1
+                if name not in STRING_OPS and name not in GET_OPS and name not in PUT_OPS and name != "MEMOIZE":
+                    recent.clear()
+        except Exception as e:
+            if not pickles:
+                raise
+            trailing = f"unparseable data after pickle {pickles}: {type(e).__name__}: {e}"
+            break
+        pickles += 1
+
+    unsafe = sorted({ref for ref, _ in imports if not is_allowed(ref, allowlist)})
+    return {
+        "pickles": pickles,
+        "opcodes": opcodes,
+        "calls": calls,
+        "imports": sorted({ref for ref, _ in imports}),
+        "unsafe": unsafe,
+        "trailing": trailing,
+    }
+
+
+def merge(results):
+    merged = {"pickles": 0, "opcodes": 0, "calls": 0, "imports": set(), "unsafe": set()}
+    trailing = [r["trailing"] for r in results if r["trailing"]]
+    for r in results:
+        merged["pickles"] += r["pickles"]
+        merged["opcodes"] += r["opcodes"]
+        merged["calls"] += r["calls"]
+        merged["imports"].update(r["imports"])
+        merged["unsafe"].update(r["unsafe"])
+    merged = {k: sorted(v) if isinstance(v, set) else v for k, v in merged.items()}
+    merged["trailing"] = "; ".join(trailing) or None
+    return merged
+
+
+def is_archive(path):
+    # Same test torch.load makes. zipfile.is_zipfile looks at the *end* of the
+    # file, so a pickle with a zip appended would skip the pickle that runs.
+    with open(path, "rb") as f:
+        return f.read(len(ZIP_MAGIC)) == ZIP_MAGIC
+
+
+def scan_archive(path, allowlist):
+    """Scan every member that parses as a pickle; *.pkl members must parse."""
+    members, results = [], []
+    with zipfile.ZipFile(path) as zf:
+        for member in zf.namelist():
+            with zf.open(member) as f:
+                try:
+                    result = scan_stream(f, allowlist)
+                except Exception:
+                    if member.endswith(".pkl"):
+                        raise
+                    continue  # tensor data and other non-pickle payloads
+            if result["trailing"]:
+                result["trailing"] = f"{member}: {result['trailing']}"
+            members.append(member)
+            results.append(result)
+    return members, results
+
+
+def scan_file(path, allowlist=SAFE_GLOBALS, use_mmap=False):
+    """Hash and scan one file; returns a JSON-friendly report."""
+    started = time.perf_counter()
+    report = {"path": path, "size": os.path.getsize(path)}
+    try:
+        if is_archive(path):
+            # torch.save archives: scan each embedded pickle, hash the archive
+            members, results = scan_archive(path, allowlist)
+            report.update(merge(results), members=members)
+            report["sha1"], report["sha256"] = hash_file(path, use_mmap)
+        elif use_mmap and report["size"]:
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                report.update(scan_stream(mm, allowlist))
+            report["sha1"], report["sha256"] = hash_file(path, use_mmap=True)
+        else:
+            with open(path, "rb") as f:
+                reader = HashingReader(f)
+                report.update(scan_stream(reader, allowlist))
+                reader.drain()
+            report["sha1"], report["sha256"] = reader.sha1.hexdigest(), reader.sha256.hexdigest()
+        if report["unsafe"]:
+            report["status"] = "unsafe"
+        elif report["trailing"]:
+            # Whatever follows may be loaded too; it can't be vouched for
+            report["status"] = "error"
+            report["error"] = report["trailing"]
+        else:
+            report["status"] = "ok"
+    except Exception as e:
+        report["status"] = "error"
+        report["error"] = f"{type(e).__name__}: {e}"
+    report["ms"] = (time.perf_counter() - started) * 1000
+    return report
+
+
+def _scan_job(job):
+    path, allowlist, use_mmap = job
+    return scan_file(path, allowlist, use_mmap)
+
+
+# === Discovery ===
+def find_files(targets, patterns):
+    for target in targets:
+        if os.path.isfile(target):
+            yield target
+            continue
+        for root, _, files in os.walk(target):
+            for name in files:
+                if not patterns or any(fnmatch.fnmatch(name, p) for p in patterns):
+                    yield os.path.join(root, name)
+
+
+def run_scan(paths, allowlist, use_mmap, workers):
+    """Yield reports as files finish, with a bounded number of files in flight."""
+    jobs = ((path, allowlist, use_mmap) for path in paths)
+    if workers == 1:
+        yield from map(_scan_job, jobs)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for job in jobs:
+            pending.append(pool.submit(_scan_job, job))
+            if len(pending) >= workers * 4:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+# === Self test ===
+class _Payload:
+    # Pickled only, never loaded: its __reduce__ is what a malicious file carries
+    def __reduce__(self):
+        return os.system, ("echo pwned",)
+
+
+def _zip_bytes(members):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return buf.getvalue()
+
+
+def self_test_cases():
+    """(name, file bytes, expected status) for known bypasses and clean files."""
+    evil = pickle.dumps(_Payload(), protocol=2)
+    clean = pickle.dumps({"weights": [1.0, 2.0]}, protocol=4)
+    return [
+        ("clean.pkl", clean, "ok"),
+        ("protocol0_inst.pkl", b"(S'echo pwned'\nios\nsystem\n.", "unsafe"),
+        ("ext1.pkl", b"\x80\x02\x82\x01.", "unsafe"),
+        ("zip_appended.pkl", evil + _zip_bytes({"a/data.pkl": clean}), "unsafe"),
+        # Legacy torch.save layout: magic number, protocol, sys_info, then the model
+        ("legacy_multi.pt", pickle.dumps(1) + pickle.dumps(2) + evil, "unsafe"),
+        ("legacy_clean.pt", pickle.dumps(1) + pickle.dumps(2) + clean, "ok"),
+        ("trailing_garbage.pkl", clean + b"\xff\xfe not a pickle", "error"),
+        ("archive.pt", _zip_bytes({"a/data.pkl": clean, "a/extra": pickle.dumps(0) + evil,
+                                   "a/data/0": bytes(range(256))}), "unsafe"),
+    ]
+
+
+def run_self_test():
+    import tempfile
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, data, expected in self_test_cases():
+            path = os.path.join(tmp, name)
+            with open(path, "wb") as f:
+                f.write(data)
+            for use_mmap in (False, True):
+                status = scan_file(path, SAFE_GLOBALS, use_mmap)["status"]
+                if status != expected:
+                    failures += 1
+                    print(f"❌ {name}{' (mmap)' if use_mmap else ''}: {status}, expected {expected}")
+    total = len(self_test_cases()) * 2
+    print(f"{'✅' if not failures else '❌'} self test: {total - failures}/{total} passed")
+    return failures
+
+
+def print_report(report):
+    ms = f"{report['ms']:.1f}ms"
+    if report["status"] == "error":
+        print(f"⚠️ {report['path']}: {report['error']} ({ms})")
+    elif report["status"] == "unsafe":
+        print(f"❌ {report['path']}: imports {', '.join(report['unsafe'])} ({report['sha256'][:16]}, {ms})")
+    else:
+        print(f"✅ {report['path']} ({report['opcodes']} opcodes in {report['pickles']} pickles, {report['sha256'][:16]}, {ms})")
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description=__code_desc__)
+    parser.add_argument("targets", nargs="*", help="Files or directories to scan")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(), help="Worker processes (default: all cores)")
+    parser.add_argument("--allow", action="append", default=[], help="Extra allowed global, e.g. mypkg.Model or mypkg.*")
+    parser.add_argument("--all-files", action="store_true", help=f"Scan every file, not just {' '.join(PICKLE_PATTERNS)}")
+    parser.add_argument("--mmap", action="store_true", help="Hash and walk files through mmap instead of chunked reads (mapped pages count toward RSS)")
+    parser.add_argument("--json", action="store_true", help="Emit one JSON report per line")
+    parser.add_argument("--self-test", action="store_true", help="Scan built-in malicious and clean samples and check the verdicts")
+    parser.add_argument("-v", "--version", action="version", version=f"%(prog)s {__code_version__}")
+    args = parser.parse_args()
+    if not args.targets and not args.self_test:
+        parser.error("the following arguments are required: targets")
+    return args
+
+
+def main():
+    args = get_args()
+    if args.self_test:
+        sys.exit(1 if run_self_test() else 0)
+    allowlist = frozenset(SAFE_GLOBALS | set(args.allow))
+    paths = find_files(args.targets, None if args.all_files else PICKLE_PATTERNS)
+
+    counts = {"ok": 0, "unsafe": 0, "error": 0}
+    total_bytes = 0
+    started = time.perf_counter()
+    for report in run_scan(paths, allowlist, args.mmap, args.workers):
+        counts[report["status"]] += 1
+        total_bytes += report["size"]
+        if args.json:
+            print(json.dumps(report))
+        else:
+            print_report(report)
+    elapsed = time.perf_counter() - started
+
+    if not args.json:
+        total = sum(counts.values())
+        print(f"\n📊 {total} files, {counts['ok']} ok, {counts['unsafe']} unsafe, {counts['error']} errors "
+              f"in {elapsed:.2f}s ({total_bytes / (1 << 20) / elapsed if elapsed else 0:.1f} MiB/s)")
+    sys.exit(1 if counts["unsafe"] else 0)
+
+
+if __name__ == "__main__":
+    main()
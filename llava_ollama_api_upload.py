@@ -1,14 +1,20 @@
 import base64
 import json
-import requests
+import os
 import sys
 
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+if "://" not in OLLAMA_HOST:
+    OLLAMA_HOST = f"http://{OLLAMA_HOST}"
+
 def encode_image_to_base64(image_path):
     with open(image_path, "rb") as image_file:
         return base64.b64encode(image_file.read()).decode("utf-8")
 
 def send_image_to_ollama(image_path, prompt="What's in this image?", model="llava"):
-    url = "http://localhost:11434/api/generate"
+    import requests  # deferred so the usage message stays fast
+
+    url = f"{OLLAMA_HOST}/api/generate"
     image_b64 = encode_image_to_base64(image_path)
 
     payload = {
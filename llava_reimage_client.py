@@ -8,25 +8,27 @@ import io, os, sys
 
 ## 3P Libraries
 # pip install requests, pillow, ollama
-import requests
-from PIL import Image
-from ollama import generate
+# Imported where used so the usage message doesn't pay for them
 
 def fetch_url_content(url):
+    import requests
     response = requests.get(url)
     response.raise_for_status()
     return response.content, response.headers.get('Content-Type')
 
 def display_image(image_content):
+    from PIL import Image
     image = Image.open(io.BytesIO(image_content))
     image.show()
 
 def explain_image(image_content):
+    from ollama import generate
     print("Generating explanation for the image...")
     for response in generate(MODEL, 'describe this image:', images=[image_content], stream=True):
         print(response['response'], end='', flush=True)
 
 def main(url):
+    import requests
     try:
         content, content_type = fetch_url_content(url)
         if 'image' in content_type:
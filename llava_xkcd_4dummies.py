@@ -10,29 +10,36 @@ import random
 
 ## 3P Libraries
 # pip install requests, pillow, ollama
-import requests
-from PIL import Image
-from ollama import generate
+# Imported where used so --help doesn't pay for them
 
 def get_latest_comic_number():
+    import requests
     response = requests.get('https://xkcd.com/info.0.json')
     response.raise_for_status()
     return response.json().get('num')
 
 def get_comic_info(num):
+    import requests
     response = requests.get(f'https://xkcd.com/{num}/info.0.json')
     response.raise_for_status()
     return response.json()
 
 def fetch_image_content(image_url):
+    import requests
     response = requests.get(image_url)
     response.raise_for_status()
     return response.content
 
 def display_image(image_content):
+    from PIL import Image
     image = Image.open(io.BytesIO(image_content))
     image.show()
 
+def explain_comic(image_content):
+    from ollama import generate
+    for response in generate(MODEL, 'explain this comic:', images=[image_content], stream=True):
+        print(response['response'], end='', flush=True)
+
 def get_args():
     parser = argparse.ArgumentParser(description=__code_desc__)
     parser.add_argument("comic_number", nargs="?", type=int,
@@ -42,6 +49,7 @@ def get_args():
 
 def main():
     args = get_args()
+    import requests
     if args.comic_number is not None:
         num = args.comic_number
     else:
@@ -58,8 +66,7 @@ def main():
         display_image(raw_image_content)
 
         # Generate explanation
-        for response in generate(MODEL, 'explain this comic:', images=[raw_image_content], stream=True):
-            print(response['response'], end='', flush=True)
+        explain_comic(raw_image_content)
 
     except requests.exceptions.HTTPError as e:
         print(f'Error fetching comic: {e}')
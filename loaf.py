@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+__code_desc__ = "One entry point for the loafing-with-llms scripts"
+__code_version__ = 'v0.0.1'
+__code_debug__ = False
+
+## Standard Libraries
+# Only the standard library is imported here; each subcommand imports its
+# script (and that script its dependencies) when it actually runs.
+import argparse
+import importlib.util
+import os
+import re
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Subcommands whose arguments are handed straight to the script's own parser
+FORWARDED = {
+    "eula": ("explain_eula", "Explain EULA's in plain English"),
+    "patent": ("explain_patent", "Summarize patent PDF text using Ollama"),
+    "reverse-prompt": ("reverse_prompt", "Infer the prompt behind a model output"),
+    "xkcd": ("llava_xkcd_4dummies", "Fetch an XKCD comic and have llava explain it"),
+    "routes": ("model_router", "Show recorded model latency per task"),
+}
+
+# Third-party modules each subcommand needs once it does real work
+DEPENDENCIES = {
+    "eula": ["ollama"],
+    "patent": ["ollama", "fitz", "pdf2image", "pytesseract"],
+    "reverse-prompt": ["ollama"],
+    "llava": ["requests", "PIL", "ollama"],
+    "xkcd": ["requests", "PIL", "ollama"],
+    "favicon": ["mcp.server.fastmcp", "requests", "bs4"],
+    "tools": ["ollama"],
+    "routes": [],
+}
+
+
+def load_script(filename):
+    """Import a sibling script by path (some have hyphens in their names)."""
+    path = os.path.join(HERE, filename)
+    spec = importlib.util.spec_from_file_location(os.path.basename(filename)[:-3].replace("-", "_"), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# === Subcommands ===
+def run_forwarded(name, rest):
+    module_name, _ = FORWARDED[name]
+    sys.path.insert(0, HERE)
+    module = __import__(module_name)
+    sys.argv = [f"{os.path.basename(sys.argv[0])} {name}", *rest]
+    module.main()
+
+
+def run_llava(args):
+    if args.image.startswith(("http://", "https://")):
+        load_script("llava_reimage_client.py").main(args.image)
+    else:
+        load_script("llava_ollama_api_upload.py").send_image_to_ollama(args.image, args.prompt, args.model)
+
+
+def run_favicon(args):
+    import runpy
+    server = os.path.join(HERE, "mcp", "src", "servers", "favicon.py")
+    sys.argv = [server]
+    runpy.run_path(server, run_name="__main__")
+
+
+def run_tools(args):
+    script = "tools-hello-world.py" if args.hello else "tools-decorators.py"
+    load_script(script).run_conversation(args.question)
+
+
+# === Import profiling ===
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def parse_importtime(stderr):
+    """Return [(cumulative_us, module)] for top-level imports in -X importtime output."""
+    imports = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match and len(match.group(3)) == 1:
+            imports.append((int(match.group(2)), match.group(4)))
+    return imports
+
+
+def profile(command):
+    import subprocess
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *command],
+        capture_output=True, text=True, cwd=HERE,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    imports = parse_importtime(proc.stderr)
+    return wall_ms, sum(us for us, _ in imports) / 1000, sorted(imports, reverse=True), proc.returncode
+
+
+def run_profile(args):
+    names = args.subcommands or list(DEPENDENCIES)
+    over = []
+    print(f"⏱️  Cold start per subcommand (target {args.target_ms:.0f} ms)\n")
+    print(f"{'subcommand':<16} {'wall ms':>9} {'import ms':>10}  slowest imports")
+    for name in names:
+        if args.deep:
+            # What a real run pays: the script plus its third-party dependencies
+            code = "; ".join(f"import {m}" for m in DEPENDENCIES[name])
+            wall_ms, import_ms, imports, code = profile(["-c", code])
+        else:
+            wall_ms, import_ms, imports, code = profile([os.path.join(HERE, "loaf.py"), name, "--help"])
+        slowest = ", ".join(f"{m} {us / 1000:.1f}" for us, m in imports[:args.top])
+        flag = "❌" if wall_ms > args.target_ms else "✅"
+        if code:
+            flag += f" (exited {code}; missing dependency?)"
+        if wall_ms > args.target_ms:
+            over.append(name)
+        print(f"{name:<16} {wall_ms:>9.1f} {import_ms:>10.1f}  {slowest} {flag}")
+    if over:
+        print(f"\n❌ Over target: {', '.join(over)}")
+        sys.exit(1)
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(prog="loaf", description=__code_desc__)
+    parser.add_argument("-v", "--version", action="version", version=f"%(prog)s {__code_version__}")
+    sub = parser.add_subparsers(dest="command", metavar="<command>")
+
+    for name, (_, help_text) in FORWARDED.items():
+        # -h/--help is forwarded too, so the script prints its own usage
+        sub.add_parser(name, help=help_text, add_help=False)
+
+    llava = sub.add_parser("llava", help="Describe an image file or URL with llava")
+    llava.add_argument("image", help="Path to an image file, or an image URL")
+    llava.add_argument("prompt", nargs="?", default="What is in this image?", help="Prompt for local images")
+    llava.add_argument("-m", "--model", default="llava", help="Ollama model to use (default: llava)")
+    llava.set_defaults(func=run_llava)
+
+    favicon = sub.add_parser("favicon", help="Run the favicon-hasher MCP server")
+    favicon.set_defaults(func=run_favicon)
+
+    tools = sub.add_parser("tools", help="Ask a question through the tool-calling demo")
+    tools.add_argument("question", nargs="?", default="What is 9.5 minus 4?", help="Question for the model")
+    tools.add_argument("--hello", action="store_true", help="Use tools-hello-world.py instead of tools-decorators.py")
+    tools.set_defaults(func=run_tools)
+
+    prof = sub.add_parser("profile-imports", help="Report cold-start and import time per subcommand")
+    prof.add_argument("subcommands", nargs="*", help="Subcommands to profile (default: all)")
+    prof.add_argument("--target-ms", type=float, default=150.0, help="Cold-start budget in ms (default: 150)")
+    prof.add_argument("--deep", action="store_true", help="Profile importing each subcommand's dependencies instead of --help")
+    prof.add_argument("--top", type=int, default=3, help="Slowest imports to list (default: 3)")
+    prof.set_defaults(func=run_profile)
+    return parser
+
+
+def main():
+    parser = get_parser()
+    args, rest = parser.parse_known_args()
+    if args.command in FORWARDED:
+        run_forwarded(args.command, rest)
+    elif args.command is None:
+        parser.print_help()
+    elif rest:
+        parser.error(f"unrecognized arguments: {' '.join(rest)}")
+    else:
+        args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,6 @@ import sys
 import requests
 import hashlib
 from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup
 
 # Initialize MCP
 HOST = "127.0.0.1"
@@ -53,6 +52,8 @@ def discover_favicon_links(html: str, base_url: str) -> list[str]:
     Parse HTML to find favicon-related <link> tags and return absolute URLs,
     ordered by typical preference.
     """
+    from bs4 import BeautifulSoup  # deferred; only needed once a page is fetched
+
     soup = BeautifulSoup(html or "", "html.parser")
     icon_candidates = []
 
@@ -0,0 +1,261 @@
+__code_desc__ = "Pick a model per request from recorded latency, input size and a latency or throughput target"
+__code_version__ = 'v0.0.1'
+__code_debug__ = False
+
+## Standard Libraries
+import argparse
+import json
+import os
+import statistics
+import time
+from collections import defaultdict, deque
+
+from patent_sections import estimate_tokens
+
+# Every routed request appends one line here; routing reads it back.
+#   LOAF_LATENCY_LOG=path.jsonl    record somewhere else
+#   LOAF_ROUTES=routes.json        candidate models per task (see DEFAULT_ROUTES)
+LATENCY_LOG = os.getenv("LOAF_LATENCY_LOG") or os.path.join(
+    os.path.expanduser("~"), ".cache", "loafing-with-llms", "latency.jsonl")
+ROUTES_FILE = os.getenv("LOAF_ROUTES") or os.path.join(
+    os.path.expanduser("~"), ".config", "loafing-with-llms", "routes.json")
+
+HISTORY = 200      # most recent records per (task, model) used for predictions
+MIN_SAMPLES = 3    # below this a model is "untried" and gets picked to collect data
+EXTRAPOLATE = 2.0  # no latency prediction beyond this factor of the input sizes recorded
+
+# Candidates per task, smallest first. A candidate with max_input_tokens is only
+# used for inputs up to that many tokens; with no latency or throughput target
+# the smallest candidate that fits is picked, with one the largest that meets
+# it. Without a routes file each task keeps the model it always used. A routes
+# file looks like:
+#   {"eula": [{"model": "llama3.2", "max_input_tokens": 1500}, {"model": "llama3.1"}],
+#    "patent": [{"model": "llama3.1"}, {"model": "qwen3:14b"}]}
+DEFAULT_ROUTES = {
+    "eula": [{"model": "llama3.1"}],
+    "patent": [{"model": "llama3.1"}],
+    "reverse-prompt": [{"model": "llama3.1"}],
+}
+
+
+def load_routes(path=ROUTES_FILE):
+    routes = {task: list(candidates) for task, candidates in DEFAULT_ROUTES.items()}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            routes.update(json.load(f))
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Ignoring routes file {path}: {e}")
+    return routes
+
+
+# === Recording ===
+def record(task, model, input_tokens, seconds, first_token_seconds=None, eval_count=0, eval_duration=0,
+           path=LATENCY_LOG):
+    """Append one request's latency; durations from Ollama are in nanoseconds."""
+    entry = {
+        "ts": round(time.time(), 3),
+        "task": task,
+        "model": model,
+        "input_tokens": input_tokens,
+        "seconds": round(seconds, 4),
+        "first_token_seconds": round(first_token_seconds, 4) if first_token_seconds is not None else None,
+        "tokens_per_second": round(eval_count / (eval_duration / 1e9), 2) if eval_count and eval_duration else None,
+    }
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+    except OSError as e:
+        print(f"⚠️ Could not record latency to {path}: {e}")
+    return entry
+
+
+def load_history(path=LATENCY_LOG):
+    """{(task, model): deque of the latest HISTORY records}."""
+    history = defaultdict(lambda: deque(maxlen=HISTORY))
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    history[(entry["task"], entry["model"])].append(entry)
+                except (ValueError, KeyError):
+                    continue
+    except FileNotFoundError:
+        pass
+    return history
+
+
+# === Prediction ===
+def predict_seconds(records, input_tokens):
+    """Latency at `input_tokens` from a least-squares line over past requests (median if flat).
+
+    None when there are too few records, or when `input_tokens` is far outside
+    the sizes they were recorded at: a 500-token median says nothing about 6000.
+    """
+    if len(records) < MIN_SAMPLES:
+        return None
+    xs = [r["input_tokens"] for r in records]
+    if not min(xs) / EXTRAPOLATE <= input_tokens <= max(max(xs), 1) * EXTRAPOLATE:
+        return None
+    ys = [r["seconds"] for r in records]
+    mean_x, mean_y = statistics.fmean(xs), statistics.fmean(ys)
+    spread = sum((x - mean_x) ** 2 for x in xs)
+    if not spread:
+        return statistics.median(ys)
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / spread
+    return max(mean_y + slope * (input_tokens - mean_x), 0.0)
+
+
+def predict_tps(records):
+    rates = [r["tokens_per_second"] for r in records if r.get("tokens_per_second")]
+    return statistics.median(rates) if len(rates) >= MIN_SAMPLES else None
+
+
+class Decision:
+    def __init__(self, task, model, input_tokens, reason, predicted_seconds=None, predicted_tps=None):
+        self.task = task
+        self.model = model
+        self.input_tokens = input_tokens
+        self.reason = reason
+        self.predicted_seconds = predicted_seconds
+        self.predicted_tps = predicted_tps
+
+    def __str__(self):
+        predicted = []
+        if self.predicted_seconds is not None:
+            predicted.append(f"~{self.predicted_seconds:.1f}s")
+        if self.predicted_tps is not None:
+            predicted.append(f"~{self.predicted_tps:.0f} tok/s")
+        suffix = f" (predicted {', '.join(predicted)})" if predicted else ""
+        return f"🧭 {self.task}: {self.model} for ~{self.input_tokens} tokens, {self.reason}{suffix}"
+
+
+class Router:
+    """Routes requests for tasks configured in `routes`, using recorded latency in `history`."""
+
+    def __init__(self, routes=None, history=None):
+        self.routes = routes if routes is not None else load_routes()
+        self.history = history if history is not None else load_history()
+        self.decisions = []
+
+    def route(self, task, input_tokens, max_seconds=None, min_tps=None):
+        candidates = self.routes.get(task) or DEFAULT_ROUTES[task]
+        models = [c["model"] for c in candidates]
+
+        # Only candidates meant for inputs this large; the first (smallest) is the size-based pick
+        eligible = [c["model"] for c in candidates
+                    if input_tokens <= c.get("max_input_tokens", float("inf"))] or models[-1:]
+        estimates = {}
+        for model in models:
+            records = self.history.get((task, model), ())
+            estimates[model] = (predict_seconds(records, input_tokens), predict_tps(records))
+
+        if max_seconds is None and min_tps is None:
+            model, reason = eligible[0], "size-based pick"
+        else:
+            model, reason = self._pick_for_target(eligible, estimates, max_seconds, min_tps)
+
+        decision = Decision(task, model, input_tokens, reason, *estimates[model])
+        self.decisions.append(decision)
+        return decision
+
+    def fixed(self, task, model, input_tokens):
+        """Decision for a model chosen by hand (--model)."""
+        decision = Decision(task, model, input_tokens, "set by --model")
+        self.decisions.append(decision)
+        return decision
+
+    @staticmethod
+    def _pick_for_target(models, estimates, max_seconds, min_tps):
+        def meets(model):
+            seconds, tps = estimates[model]
+            if max_seconds is not None and seconds is not None and seconds > max_seconds:
+                return False
+            if min_tps is not None and tps is not None and tps < min_tps:
+                return False
+            return True
+
+        # `models` are the candidates sized for this input, smallest first
+        untried = [m for m in models if estimates[m][0] is None]
+        if untried:
+            return untried[0], "no latency data at this size yet"
+        # The largest candidate that meets the target
+        for model in reversed(models):
+            if meets(model):
+                return model, "meets target"
+        # Nothing does: fall back to the fastest measured candidate
+        fastest = min(models, key=lambda m: estimates[m][0] if estimates[m][0] is not None else float("inf"))
+        return fastest, "no candidate meets target, using fastest"
+
+    def record(self, decision, seconds, first_token_seconds=None, eval_count=0, eval_duration=0):
+        entry = record(decision.task, decision.model, decision.input_tokens, seconds,
+                       first_token_seconds, eval_count, eval_duration)
+        self.history[(decision.task, decision.model)].append(entry)
+        return entry
+
+
+# === Reporting ===
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def latency_table(history, tasks=None):
+    lines = [f"{'task':<16} {'model':<20} {'n':>5} {'p50 s':>8} {'p90 s':>8} {'p99 s':>8} {'ttft p50':>9} {'tok/s':>7}"]
+    for (task, model), records in sorted(history.items()):
+        if tasks and task not in tasks or not records:
+            continue
+        seconds = [r["seconds"] for r in records]
+        ttft = [r["first_token_seconds"] for r in records if r.get("first_token_seconds") is not None]
+        tps = predict_tps(records)
+        lines.append(
+            f"{task:<16} {model:<20} {len(records):>5} {percentile(seconds, 0.5):>8.2f} "
+            f"{percentile(seconds, 0.9):>8.2f} {percentile(seconds, 0.99):>8.2f} "
+            f"{(f'{percentile(ttft, 0.5):.2f}' if ttft else '-'):>9} {(f'{tps:.0f}' if tps else '-'):>7}"
+        )
+    return "\n".join(lines)
+
+
+def run_report(router, entries):
+    """Routing decisions and latency of the requests made this run."""
+    if not router.decisions:
+        return ""
+    counts = defaultdict(int)
+    for decision in router.decisions:
+        counts[decision.model] += 1
+    lines = ["📊 Routing", "   " + ", ".join(f"{model}: {n}" for model, n in counts.items())]
+    by_model = defaultdict(list)
+    for entry in entries:
+        by_model[entry["model"]].append(entry["seconds"])
+    for model, seconds in by_model.items():
+        lines.append(f"   {model:<20} p50 {percentile(seconds, 0.5):.2f}s  p90 {percentile(seconds, 0.9):.2f}s  "
+                     f"max {max(seconds):.2f}s over {len(seconds)} requests")
+    return "\n".join(lines)
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description=__code_desc__)
+    parser.add_argument("tasks", nargs="*", help="Only show these tasks (default: all)")
+    parser.add_argument("--routes", action="store_true", help="Print the candidate models per task and exit")
+    parser.add_argument("-v", "--version", action="version", version=f"%(prog)s {__code_version__}")
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    if args.routes:
+        print(json.dumps(load_routes(), indent=2))
+        return
+    history = load_history()
+    if not any(history.values()):
+        print(f"❗ No latency recorded yet in {LATENCY_LOG}.")
+        return
+    print(f"📊 Recorded latency ({LATENCY_LOG})\n")
+    print(latency_table(history, args.tasks))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+__code_desc__ = "Benchmark the scripts' client-side overhead against a local fake Ollama server"
+__code_version__ = 'v0.0.1'
+__code_debug__ = False
+
+## Standard Libraries
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import ollama_fake_server as fake
+from loaf import load_script
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Lines the scripts print when a request fails ("❌ Error: …", llava upload's "Error 500: …")
+ERROR_LINE = re.compile(r"^(❌|Error \d{3}:)", re.MULTILINE)
+SAMPLE_TEXT = ("The licensee may not redistribute, sublicense or reverse engineer the software. " * 120)[:8000]
+
+
+# === Targets ===
+# Each builder imports its script and returns a zero-argument callable doing one request.
+def target_tools():
+    td = load_script("tools-decorators.py")
+    td.DEBUG = False
+    return lambda: td.run_conversation("What is 9.5 minus 4?")
+
+
+def target_eula():
+    eula = load_script("explain_eula.py")
+    return lambda: eula.explain_eula_stream(SAMPLE_TEXT)
+
+
+def target_patent():
+    patent = load_script("explain_patent.py")
+    return lambda: patent.simplify_patent_text(SAMPLE_TEXT, patent.MODEL)
+
+
+def target_reverse_prompt():
+    reverse = load_script("reverse_prompt.py")
+    return lambda: reverse.infer(SAMPLE_TEXT)
+
+
+def target_llava_upload():
+    upload = load_script("llava_ollama_api_upload.py")
+    handle, image_path = tempfile.mkstemp(suffix=".png")
+    with os.fdopen(handle, "wb") as f:
+        f.write(fake.PIXEL_PNG)
+    return lambda: upload.send_image_to_ollama(image_path, "What is in this image?")
+
+
+def target_llava_reimage():
+    reimage = load_script("llava_reimage_client.py")
+    return lambda: reimage.explain_image(fake.PIXEL_PNG)
+
+
+def target_xkcd():
+    xkcd = load_script("llava_xkcd_4dummies.py")
+    return lambda: xkcd.explain_comic(fake.PIXEL_PNG)
+
+
+TARGETS = {
+    "tools": target_tools,
+    "eula": target_eula,
+    "patent": target_patent,
+    "reverse-prompt": target_reverse_prompt,
+    "llava-upload": target_llava_upload,
+    "llava-reimage": target_llava_reimage,
+    "xkcd": target_xkcd,
+}
+
+
+# === Measurement ===
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(pct / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def timed(op):
+    """Return (seconds, failed) for one op."""
+    started = time.perf_counter()
+    try:
+        op()
+    except Exception:
+        return time.perf_counter() - started, True
+    return time.perf_counter() - started, False
+
+
+# === Fake server ===
+# The server runs in its own process: sharing a GIL with the client threads
+# would inflate the very client overhead being measured.
+def start_fake_server(args):
+    """Start ollama_fake_server.py on a free port; returns (process, base_url)."""
+    command = [
+        sys.executable, os.path.join(HERE, "ollama_fake_server.py"), "--port", "0",
+        "--token-rate", str(args.token_rate), "--ttft", str(args.ttft),
+        "--chunk-tokens", str(args.chunk_tokens), "--response-tokens", str(args.response_tokens),
+    ]
+    proc = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    match = re.search(r"http://\S+", proc.stdout.readline())
+    if not match:
+        proc.kill()
+        raise RuntimeError("fake server did not report its address")
+    return proc, match.group(0)
+
+
+def server_stats(base_url):
+    with urllib.request.urlopen(f"{base_url}/_fake/stats") as response:
+        return json.load(response)
+
+
+def run_level(op, base_url, requests, concurrency):
+    """Run `requests` ops at `concurrency`; returns a result row."""
+    before = server_stats(base_url)
+    captured = io.StringIO()
+    with contextlib.redirect_stdout(captured), ThreadPoolExecutor(max_workers=concurrency) as pool:
+        started = time.perf_counter()
+        outcomes = list(pool.map(lambda _: timed(op), range(requests)))
+        wall = time.perf_counter() - started
+
+    after = server_stats(base_url)
+    server = {key: after[key] - before[key] for key in ("requests", "busy_seconds")}
+    latencies = sorted(seconds for seconds, _ in outcomes)
+    failures = sum(failed for _, failed in outcomes)
+    # Everything the client spent beyond the server's own handling time
+    overhead = max(sum(latencies) - server["busy_seconds"], 0.0) / requests
+    output = captured.getvalue()
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "server_calls": server["requests"],
+        # Most scripts print their errors instead of raising
+        "errors": failures + len(ERROR_LINE.findall(output)),
+        "wall_s": wall,
+        "throughput_rps": requests / wall if wall else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p90_ms": percentile(latencies, 90) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "overhead_ms": overhead * 1000,
+    }
+
+
+def print_table(target, rows):
+    print(f"\n📊 {target}")
+    print(f"{'conc':>5} {'reqs':>6} {'calls':>6} {'err':>4} {'req/s':>9} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'overhead ms':>12}")
+    for r in rows:
+        print(
+            f"{r['concurrency']:>5} {r['requests']:>6} {r['server_calls']:>6} {r['errors']:>4} "
+            f"{r['throughput_rps']:>9.1f} {r['p50_ms']:>9.2f} {r['p90_ms']:>9.2f} {r['p99_ms']:>9.2f} "
+            f"{r['overhead_ms']:>12.3f}"
+        )
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description=__code_desc__)
+    parser.add_argument("targets", nargs="*", default=list(TARGETS), help=f"Targets to run (default: all of {', '.join(TARGETS)})")
+    parser.add_argument("-c", "--concurrency", default="1,4,16", help="Comma-separated concurrency levels (default: 1,4,16)")
+    parser.add_argument("-n", "--requests", type=int, default=50, help="Requests per concurrency level (default: 50)")
+    parser.add_argument("--token-rate", type=float, default=0.0, help="Fake tokens per second (default: unlimited)")
+    parser.add_argument("--ttft", type=float, default=0.0, help="Fake time-to-first-token in seconds (default: 0)")
+    parser.add_argument("--chunk-tokens", type=int, default=1, help="Tokens per streamed chunk (default: 1)")
+    parser.add_argument("--response-tokens", type=int, default=64, help="Tokens per generated response (default: 64)")
+    parser.add_argument("--json", dest="json_out", help="Also write results to this JSON file")
+    parser.add_argument("-v", "--version", action="version", version=f"%(prog)s {__code_version__}")
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    unknown = [t for t in args.targets if t not in TARGETS]
+    if unknown:
+        print(f"❌ Unknown targets: {', '.join(unknown)}")
+        sys.exit(1)
+
+    server, base_url = start_fake_server(args)
+    # Scripts pick up OLLAMA_HOST when they (and the ollama client) are first imported
+    os.environ["OLLAMA_HOST"] = base_url
+    print(f"🧪 Fake Ollama at {base_url}")
+
+    levels = [int(c) for c in args.concurrency.split(",")]
+    results = {}
+    try:
+        for target in args.targets:
+            try:
+                op = TARGETS[target]()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    op()  # warm up imports and connections
+            except ImportError as e:
+                print(f"\n⚠️ Skipping {target}: {e}")
+                continue
+            results[target] = [run_level(op, base_url, args.requests, c) for c in levels]
+            print_table(target, results[target])
+    finally:
+        server.terminate()
+        server.wait()
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
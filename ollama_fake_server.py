@@ -0,0 +1,308 @@
+__code_desc__ = "Stand-in Ollama HTTP server with scripted, rate-limited responses for load testing"
+__code_version__ = 'v0.0.1'
+__code_debug__ = False
+
+## Standard Libraries
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from patent_sections import estimate_tokens
+
+HOST = "127.0.0.1"
+PORT = 11434
+
+# A 1x1 transparent PNG, served at /image.png for the llava clients
+PIXEL_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d49484452000000010000000108060000001f15c489"
+    "0000000d49444154789c6360000002000001e221bc330000000049454e44ae426082"
+)
+
+
+class FakeConfig:
+    def __init__(self, token_rate=0.0, ttft=0.0, chunk_tokens=1, response_tokens=64,
+                 embed_dim=64, script=None, prompt_rate=0.0):
+        self.token_rate = token_rate          # generated tokens/sec, 0 = as fast as possible
+        self.ttft = ttft                      # seconds before the first token
+        self.prompt_rate = prompt_rate        # uncached prompt tokens evaluated/sec, 0 = free
+        self.chunk_tokens = max(chunk_tokens, 1)
+        self.response_tokens = response_tokens
+        self.embed_dim = embed_dim
+        self.script = script or []            # assistant messages replayed in order for /api/chat
+        self._script_iter = itertools.cycle(self.script) if self.script else None
+        self._lock = threading.Lock()
+        self._prompts = {}                    # model -> (options, last prompt) for prefix-cache emulation
+        self.requests = 0
+        self.busy_seconds = 0.0
+
+    def next_scripted(self):
+        if self._script_iter is None:
+            return None
+        with self._lock:
+            return next(self._script_iter)
+
+    def cached_chars(self, model, options, prompt):
+        """Characters of `prompt` already in the model's cache, like Ollama's KV-cache reuse.
+
+        Changing options (num_ctx etc.) reloads the model and drops the cache.
+        """
+        with self._lock:
+            previous = self._prompts.get(model)
+            self._prompts[model] = (options, prompt)
+        if previous is None or previous[0] != options:
+            return 0
+        return len(os.path.commonprefix([previous[1], prompt]))
+
+    def record(self, seconds):
+        with self._lock:
+            self.requests += 1
+            self.busy_seconds += seconds
+
+    def stats(self):
+        with self._lock:
+            return {"requests": self.requests, "busy_seconds": self.busy_seconds}
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.busy_seconds = 0.0
+            self._prompts.clear()
+
+
+def fake_args(parameters):
+    """Synthesize arguments that satisfy a tool's JSON schema."""
+    args = {}
+    for name, schema in parameters.get("properties", {}).items():
+        if "enum" in schema:
+            args[name] = schema["enum"][0]
+            continue
+        args[name] = {
+            "integer": 1, "number": 1.5, "boolean": True,
+            "array": [], "object": {},
+        }.get(schema.get("type"), "x")
+    return args
+
+
+def fake_embedding(text, dim):
+    digest = hashlib.sha256(text.encode()).digest()
+    vector = [(digest[i % len(digest)] - 128) / 128 for i in range(dim)]
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Small streamed chunks otherwise stall ~40ms on delayed ACKs
+    disable_nagle_algorithm = True
+    config = FakeConfig()
+
+    def log_message(self, fmt, *args):
+        if __code_debug__:
+            super().log_message(fmt, *args)
+
+    def _send_json(self, body, status=200):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path == "/image.png":
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(PIXEL_PNG)))
+            self.end_headers()
+            self.wfile.write(PIXEL_PNG)
+        elif self.path == "/_fake/stats":
+            self._send_json(self.config.stats())
+        elif self.path in ("/", "/api/version"):
+            self._send_json({"version": "0.0.0-fake"})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        started = time.perf_counter()
+        try:
+            body = self._read_json()
+            if self.path == "/api/chat":
+                self._chat(body)
+            elif self.path == "/api/generate":
+                self._generate(body)
+            elif self.path in ("/api/embeddings", "/api/embed"):
+                self._embeddings(body)
+            else:
+                self._send_json({"error": "not found"}, status=404)
+        finally:
+            self.config.record(time.perf_counter() - started)
+
+    # === Endpoints ===
+    def _chat(self, body):
+        messages = body.get("messages", [])
+        prompt = "".join(f"<{m.get('role')}>{m.get('content') or ''}" for m in messages)
+        prompt += json.dumps(body.get("tools") or [])
+        prompt_tokens = self._prompt_tokens(body, prompt)
+
+        message = self.config.next_scripted()
+        if message is None:
+            message = {"role": "assistant", "content": ""}
+            tools = body.get("tools") or []
+            # Request a tool once per user turn, then answer
+            if tools and messages and messages[-1].get("role") == "user":
+                function = tools[0]["function"]
+                message["tool_calls"] = [{
+                    "function": {"name": function["name"], "arguments": fake_args(function["parameters"])}
+                }]
+        self._respond(body, prompt_tokens, message, "message")
+
+    def _generate(self, body):
+        prompt_tokens = self._prompt_tokens(body, body.get("system", "") + body.get("prompt", ""))
+        prompt_tokens += 576 * len(body.get("images") or [])  # llava's per-image token cost
+        self._respond(body, prompt_tokens, None, "response")
+
+    def _prompt_tokens(self, body, prompt):
+        options = {k: v for k, v in (body.get("options") or {}).items() if k == "num_ctx"}
+        cached = self.config.cached_chars(body.get("model"), options, prompt)
+        return max(estimate_tokens(prompt[cached:]), 1)
+
+    def _embeddings(self, body):
+        dim = self.config.embed_dim
+        if self.path == "/api/embed":
+            inputs = body.get("input", "")
+            inputs = [inputs] if isinstance(inputs, str) else inputs
+            self._send_json({"model": body.get("model"), "embeddings": [fake_embedding(t, dim) for t in inputs]})
+        else:
+            self._send_json({"embedding": fake_embedding(body.get("prompt", ""), dim)})
+
+    def _respond(self, body, prompt_tokens, message, field):
+        """Emit `message` (chat) or filler text, streamed in chunks or as one JSON body."""
+        config = self.config
+        n_tokens = 0 if message and (message.get("content") or message.get("tool_calls")) else config.response_tokens
+        text = message.get("content", "") if message else ""
+        tokens = [text] if text else ["tok "] * n_tokens
+        per_token = 1 / config.token_rate if config.token_rate else 0.0
+        base = {"model": body.get("model", "fake"), "created_at": datetime.now(timezone.utc).isoformat()}
+
+        started = time.perf_counter_ns()
+        prompt_seconds = config.ttft + (prompt_tokens / config.prompt_rate if config.prompt_rate else 0.0)
+        if prompt_seconds:
+            time.sleep(prompt_seconds)
+
+        def piece(chunk_text):
+            if field == "message":
+                return {"message": {"role": "assistant", "content": chunk_text}}
+            return {"response": chunk_text}
+
+        stream = body.get("stream", True)
+        chunks = [tokens[i:i + config.chunk_tokens] for i in range(0, len(tokens), config.chunk_tokens)]
+
+        if stream:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for chunk in chunks:
+                if per_token:
+                    time.sleep(per_token * len(chunk))
+                self._write_chunk(dict(base, done=False, **piece("".join(chunk))))
+        elif per_token:
+            time.sleep(per_token * len(tokens))
+
+        eval_tokens = max(len(tokens), 1)
+        total = time.perf_counter_ns() - started
+        final = dict(
+            base,
+            done=True,
+            done_reason="stop",
+            total_duration=total,
+            load_duration=0,
+            prompt_eval_count=prompt_tokens,
+            prompt_eval_duration=int(prompt_seconds * 1e9),
+            eval_count=eval_tokens,
+            eval_duration=int(per_token * eval_tokens * 1e9),
+        )
+        if stream:
+            final.update(piece(""))
+            if message and message.get("tool_calls"):
+                final["message"]["tool_calls"] = message["tool_calls"]
+            self._write_chunk(final)
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            if message is not None:
+                final["message"] = dict(message, content=message.get("content") or "".join(tokens))
+            else:
+                final.update(piece("".join(tokens)))
+            self._send_json(final)
+
+    def _write_chunk(self, obj):
+        data = json.dumps(obj).encode() + b"\n"
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+def start_server(config=None, host=HOST, port=0):
+    """Start a fake server on a background thread; returns (server, base_url)."""
+    handler = type("Handler", (FakeOllamaHandler,), {"config": config or FakeConfig()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def load_script(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def get_args():
+    parser = argparse.ArgumentParser(description=__code_desc__)
+    parser.add_argument("--host", default=HOST, help=f"Bind address (default: {HOST})")
+    parser.add_argument("--port", type=int, default=PORT, help=f"Port (default: {PORT})")
+    parser.add_argument("--token-rate", type=float, default=0.0, help="Generated tokens per second (default: unlimited)")
+    parser.add_argument("--ttft", type=float, default=0.0, help="Seconds before the first token (default: 0)")
+    parser.add_argument("--prompt-rate", type=float, default=0.0, help="Uncached prompt tokens evaluated per second (default: unlimited)")
+    parser.add_argument("--chunk-tokens", type=int, default=1, help="Tokens per streamed chunk (default: 1)")
+    parser.add_argument("--response-tokens", type=int, default=64, help="Tokens in generated filler responses (default: 64)")
+    parser.add_argument("--embed-dim", type=int, default=64, help="Embedding vector size (default: 64)")
+    parser.add_argument("--script", help="JSONL of assistant messages replayed in order by /api/chat")
+    parser.add_argument("-v", "--version", action="version", version=f"%(prog)s {__code_version__}")
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    config = FakeConfig(
+        token_rate=args.token_rate,
+        ttft=args.ttft,
+        prompt_rate=args.prompt_rate,
+        chunk_tokens=args.chunk_tokens,
+        response_tokens=args.response_tokens,
+        embed_dim=args.embed_dim,
+        script=load_script(args.script) if args.script else None,
+    )
+    handler = type("Handler", (FakeOllamaHandler,), {"config": config})
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    server.daemon_threads = True
+    # The real port is printed (and flushed) so --port 0 works for callers like ollama_bench.py
+    print(f"🧪 Fake Ollama listening on http://{args.host}:{server.server_address[1]} (Ctrl+C to stop)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stopped.")
+
+
+if __name__ == "__main__":
+    main()
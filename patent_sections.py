@@ -0,0 +1,211 @@
+__code_desc__ = "Split patent text into sections and pick the most useful ones for a prompt"
+__code_version__ = 'v0.0.1'
+__code_debug__ = False
+
+## Standard Libraries
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "loafing-with-llms", "patents")
+HEAD_CHARS = 32000  # raw text kept for patents with no recognizable headings
+INDEX_VERSION = 1   # bump when index_sections changes, so cached indexes are rebuilt
+
+HEADINGS = [
+    ("abstract", r"(\(57\)\s*)?abstract( of the disclosure)?"),
+    ("field", r"(technical )?field( of the (invention|disclosure))?"),
+    ("background", r"background( of the (invention|disclosure))?|description of (the )?related art"),
+    ("summary", r"(brief )?summary( of the (invention|disclosure))?"),
+    ("figures", r"brief description of (the )?(several views of the )?(drawings?|figures)"),
+    ("detailed_description", r"detailed description.*|description of (the )?(preferred )?embodiments?"),
+    ("claims", r"claims|(what|that) is claimed( is)?|(we|i) claim|the invention claimed is"),
+]
+HEADING_RE = [(name, re.compile(rf"^\s*(?:{pattern})\s*:?\s*$", re.IGNORECASE)) for name, pattern in HEADINGS]
+CLAIM_START_RE = re.compile(r"(?m)^\s*(\d{1,3})\s*\.\s+(?=\S)")
+DEPENDENT_RE = re.compile(r"\b(claim|claims)\s+\d+", re.IGNORECASE)
+
+# Highest value first; (section, share of the remaining budget it may take)
+PRIORITY = [
+    ("abstract", 1.0),
+    ("independent_claims", 1.0),
+    ("summary", 0.5),
+    ("field", 0.5),
+    ("background", 0.3),
+    ("figures", 0.3),
+    ("dependent_claims", 0.5),
+    ("detailed_description", 1.0),
+]
+LABELS = {
+    "abstract": "ABSTRACT",
+    "independent_claims": "INDEPENDENT CLAIMS",
+    "dependent_claims": "DEPENDENT CLAIMS",
+    "summary": "SUMMARY",
+    "field": "FIELD",
+    "background": "BACKGROUND",
+    "figures": "FIGURE DESCRIPTIONS",
+    "detailed_description": "DETAILED DESCRIPTION",
+}
+
+
+def estimate_tokens(text):
+    return len(text) // 4
+
+
+def _heading(line):
+    if len(line) > 80:
+        return None
+    for name, pattern in HEADING_RE:
+        if pattern.match(line):
+            return name
+    return None
+
+
+def split_claims(text):
+    """Return [{"number", "text", "dependent"}] for numbered claims."""
+    starts = list(CLAIM_START_RE.finditer(text))
+    claims = []
+    for i, match in enumerate(starts):
+        end = starts[i + 1].start() if i + 1 < len(starts) else len(text)
+        body = " ".join(text[match.end():end].split())
+        claims.append({
+            "number": int(match.group(1)),
+            "text": body,
+            "dependent": bool(DEPENDENT_RE.search(body)),
+        })
+    return claims
+
+
+def index_sections(text):
+    """Parse extracted patent text into a JSON-serializable section index."""
+    sections = {}
+    current = "front_matter"
+    buffer = []
+
+    def close():
+        if buffer:
+            body = "\n".join(buffer).strip()
+            if body:
+                sections[current] = f"{sections[current]}\n{body}" if current in sections else body
+
+    for line in text.splitlines():
+        name = _heading(line)
+        if name:
+            close()
+            current, buffer = name, []
+        else:
+            buffer.append(line)
+    close()
+
+    claims = split_claims(sections.get("claims", ""))
+    return {
+        "sections": sections,
+        "claims": claims,
+        "head": text[:HEAD_CHARS] if len(sections) <= 1 else "",
+    }
+
+
+def _fit(text, budget_tokens):
+    max_chars = budget_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind(" ", 0, max_chars)
+    return text[:cut if cut > 0 else max_chars] + " …"
+
+
+def _claims_text(claims, budget_tokens):
+    # Whole claims only, in order, while they fit
+    picked, used = [], 0
+    for claim in claims:
+        line = f"{claim['number']}. {claim['text']}"
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget_tokens:
+            break
+        picked.append(line)
+        used += cost
+    return "\n".join(picked)
+
+
+def build_prompt_text(index, budget_tokens):
+    """Assemble the highest-value sections into roughly `budget_tokens` tokens."""
+    sections = index["sections"]
+    if index.get("head") or not sections:
+        return _fit(index.get("head") or "", budget_tokens)
+
+    claims = index["claims"]
+    available = {}
+    labels = LABELS
+    if claims:
+        available = {
+            "independent_claims": [c for c in claims if not c["dependent"]],
+            "dependent_claims": [c for c in claims if c["dependent"]],
+        }
+    elif sections.get("claims"):
+        # Claim numbers didn't parse (common after OCR): send the claims text as is
+        sections = dict(sections, independent_claims=sections["claims"])
+        labels = dict(LABELS, independent_claims="CLAIMS")
+
+    parts = []
+    remaining = budget_tokens
+    for name, share in PRIORITY:
+        if remaining <= 0:
+            break
+        allowance = max(int(remaining * share), 1)
+        if name in available:
+            body = _claims_text(available[name], allowance)
+        else:
+            body = _fit(sections.get(name, ""), allowance)
+        if not body:
+            continue
+        block = f"{labels[name]}:\n{body}"
+        parts.append(block)
+        remaining -= estimate_tokens(block) + 1
+
+    if not parts:
+        return _fit(sections.get("front_matter", ""), budget_tokens)
+    return "\n\n".join(parts)
+
+
+def describe(index):
+    """One line per section with its size, for --sections."""
+    lines = [f"{name:<22} ~{estimate_tokens(body):>6} tokens" for name, body in index["sections"].items()]
+    independent = sum(1 for c in index["claims"] if not c["dependent"])
+    lines.append(f"{'claims':<22} {len(index['claims'])} total, {independent} independent")
+    return "\n".join(lines)
+
+
+# === Cache ===
+def file_digest(path):
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _cache_path(digest, cache_dir):
+    return os.path.join(cache_dir, f"{digest}.v{INDEX_VERSION}.json")
+
+
+def load_cached_index(digest, cache_dir=CACHE_DIR):
+    path = _cache_path(digest, cache_dir)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_cached_index(digest, index, cache_dir=CACHE_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_path(digest, cache_dir)
+    # A unique temp file per writer, so parallel workers indexing the same patent don't collide
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
@@ -0,0 +1,172 @@
+__code_desc__ = "Stable instruction prefix + variable document suffix, so Ollama can reuse its prompt cache"
+__code_version__ = 'v0.0.1'
+__code_debug__ = False
+
+## Standard Libraries
+import time
+
+import model_router
+from patent_sections import estimate_tokens
+
+# Ollama keeps a model's KV cache only while the model stays loaded with the
+# same options. A change in num_ctx (or an expired keep_alive) reloads the
+# model and every request pays for the full prompt again.
+KEEP_ALIVE = "30m"
+OPTIONS = {"num_ctx": 4096}
+PROBE = "."  # stand-in document for warm(), so it renders the same template as real requests
+
+
+class PrefixSession:
+    """Sends documents to `model` as [system: instructions, user: label + document].
+
+    The instructions go in a system message that is byte-identical on every
+    call, so back-to-back documents can reuse the server's prompt cache and
+    only the document is evaluated. Per-call prompt_eval stats are kept for
+    `report()`.
+    """
+
+    def __init__(self, model, instructions, label, options=None, keep_alive=KEEP_ALIVE):
+        self.model = model
+        self.instructions = instructions
+        self.label = label
+        self.options = dict(OPTIONS, **(options or {}))
+        self.keep_alive = keep_alive
+        self.prefix_tokens = None      # measured by warm()
+        self.prefix_ns = None
+        self.calls = []                # (name, prompt_eval_count, prompt_eval_duration ns, wall seconds)
+        self.last = None               # latency of the latest call, in model_router.record's terms
+
+    def messages(self, document):
+        return [
+            {"role": "system", "content": self.instructions},
+            {"role": "user", "content": f"{self.label}:\n{document}"},
+        ]
+
+    def warm(self):
+        """Load the model and evaluate the shared prefix once, measuring what it costs.
+
+        The request is a real one with PROBE as the document, so the count
+        includes the chat template's system and user headers. It also includes
+        the probe and the assistant header, a few tokens that aren't shared.
+        """
+        import ollama
+
+        response = ollama.chat(
+            model=self.model,
+            messages=self.messages(PROBE),
+            options=dict(self.options, num_predict=1),
+            keep_alive=self.keep_alive,
+        )
+        self.prefix_tokens = response.get("prompt_eval_count") or 0
+        self.prefix_ns = response.get("prompt_eval_duration") or 0
+        return self.prefix_tokens
+
+    def stream(self, document, name=None):
+        """Yield content pieces for `document`; the final chunk's stats are recorded."""
+        import ollama
+
+        started = time.perf_counter()
+        stream = ollama.chat(
+            model=self.model,
+            messages=self.messages(document),
+            options=self.options,
+            keep_alive=self.keep_alive,
+            stream=True,
+        )
+        first_token = None
+        for chunk in stream:
+            if first_token is None and chunk['message']['content']:
+                first_token = time.perf_counter() - started
+            if chunk.get("done"):
+                seconds = time.perf_counter() - started
+                self.calls.append((
+                    name or f"#{len(self.calls) + 1}",
+                    chunk.get("prompt_eval_count") or 0,
+                    chunk.get("prompt_eval_duration") or 0,
+                    seconds,
+                ))
+                self.last = {
+                    "seconds": seconds,
+                    "first_token_seconds": first_token,
+                    "eval_count": chunk.get("eval_count") or 0,
+                    "eval_duration": chunk.get("eval_duration") or 0,
+                }
+            yield chunk['message']['content']
+
+    def report(self):
+        """Measured prompt-eval totals for the calls so far, and an estimate of what the prefix saved."""
+        if not self.calls:
+            return "📊 No requests made."
+        tokens = sum(c[1] for c in self.calls)
+        eval_ms = sum(c[2] for c in self.calls) / 1e6
+        lines = [f"📊 Prompt evaluation over {len(self.calls)} requests ({self.model})"]
+        for name, count, ns, wall in self.calls:
+            lines.append(f"   {name:<32} {count:>7} tokens {ns / 1e6:>9.1f} ms prompt eval  {wall:>7.2f}s total")
+        lines.append(f"   {'total':<32} {tokens:>7} tokens {eval_ms:>9.1f} ms prompt eval")
+        if self.prefix_tokens:
+            # Ollama doesn't say which requests hit its cache, so this is the
+            # most the shared prefix could have saved, not a measurement
+            lines.append(f"   estimate: the shared prefix costs ~{self.prefix_tokens} tokens "
+                         f"(~{self.prefix_ns / 1e6:.1f} ms) uncached; if every request reused it, "
+                         f"up to ~{self.prefix_tokens * len(self.calls)} tokens / "
+                         f"~{self.prefix_ns / 1e6 * len(self.calls):.1f} ms of prompt eval were skipped")
+        return "\n".join(lines)
+
+
+class RoutedSessions:
+    """PrefixSession stand-in that routes each document to a model for `task`.
+
+    The model comes from model_router (or is fixed by `model`). There is one
+    PrefixSession per model so each keeps its own prompt cache. When `warm` is
+    set, a session is warmed the first time its model is picked.
+    """
+
+    def __init__(self, task, instructions, label, model=None, max_seconds=None, min_tps=None, warm=False,
+                 router=None):
+        self.task = task
+        self.instructions = instructions
+        self.label = label
+        self.model = model
+        self.max_seconds = max_seconds
+        self.min_tps = min_tps
+        self.warm = warm
+        self.router = router or model_router.Router()
+        self.sessions = {}
+        self.entries = []
+
+    def session(self, model):
+        if model not in self.sessions:
+            session = PrefixSession(model, self.instructions, self.label)
+            if self.warm:
+                try:
+                    session.warm()
+                except Exception as e:
+                    print(f"⚠️ Could not warm {model}: {e}")
+            self.sessions[model] = session
+        return self.sessions[model]
+
+    def stream(self, document, name=None):
+        input_tokens = estimate_tokens(document)
+        if self.model:
+            # Still recorded, so a fixed model's runs feed later routing
+            decision = self.router.fixed(self.task, self.model, input_tokens)
+        else:
+            decision = self.router.route(self.task, input_tokens, self.max_seconds, self.min_tps)
+            print(decision)
+        return self._stream(decision, document, name)
+
+    def _stream(self, decision, document, name):
+        session = self.session(decision.model)
+        session.last = None
+        yield from session.stream(document, name)
+        if session.last:
+            self.entries.append(self.router.record(decision, **session.last))
+
+    @property
+    def calls(self):
+        return [call for session in self.sessions.values() for call in session.calls]
+
+    def report(self):
+        reports = [session.report() for session in self.sessions.values() if session.calls]
+        routing = model_router.run_report(self.router, self.entries)
+        return "\n".join(reports + ([routing] if routing else [])) or "📊 No requests made."
@@ -3,48 +3,57 @@ __code_version__ = 'v0.0.1'
 __code_debug__ = False
 
 import argparse
-import ollama
+
+from prompt_prefix import PrefixSession, RoutedSessions
 
 MODEL = "llama3.1"
 SPINNER_STOP = False
+INSTRUCTIONS = """You are a reverse prompt engineer. Given an output from a language model, your job is to infer the original prompt or describe the intent, structure, and content that might have led to this output. Be precise and technical."""
 
 def read_target(file_path):
     with open(file_path, 'r', encoding='utf-8') as f:
         return f.read()
 
-def infer(text, model=MODEL):
-    prompt = f"""You are a reverse prompt engineer. Given an output from a language model, your job is to infer the original prompt or describe the intent, structure, and content that might have led to this output. Be precise and technical."
-
-TEXT:
-{text[:8000]}"""
+def new_session(model=MODEL):
+    return PrefixSession(model, INSTRUCTIONS, "TEXT")
 
+def infer(text, model=MODEL, session=None, name=None):
+    session = session or new_session(model)
     try:
-        stream = ollama.chat(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            stream=True
-        )
+        stream = session.stream(text[:8000], name)
         print("\n📜 Inferrence:\n")
-        for chunk in stream:
-            print(chunk['message']['content'], end='', flush=True)
+        for piece in stream:
+            print(piece, end='', flush=True)
 
     except Exception as e:
         print(f"\n❌ Error: {e}")
 
 def main():
     parser = argparse.ArgumentParser(description=__code_desc__)
-    parser.add_argument("target", help="Path to a target text file")
-    parser.add_argument("-m", "--model", default=MODEL, help=f"Ollama model to use (default: {MODEL})")
+    parser.add_argument("targets", nargs="+", help="Path to one or more target text files")
+    parser.add_argument("-m", "--model", help=f"Ollama model to use (default: routed by model_router.py, else {MODEL})")
+    parser.add_argument("--max-latency", type=float, help="Route to a model predicted to answer within this many seconds")
+    parser.add_argument("--min-tps", type=float, help="Route to a model generating at least this many tokens/s")
     parser.add_argument("-v", "--version", action="version", version=f"%(prog)s {__code_version__}")
     args = parser.parse_args()
 
-    try:
-        target_text = read_target(args.target)
-        infer(target_text, model=args.model)
-    except FileNotFoundError:
-        print(f"❌ File not found: {args.target}")
-    except Exception as e:
-        print(f"❌ Failed to process target: {e}")
+    batch = len(args.targets) > 1
+    session = RoutedSessions("reverse-prompt", INSTRUCTIONS, "TEXT", model=args.model,
+                             max_seconds=args.max_latency, min_tps=args.min_tps, warm=batch)
+
+    for target in args.targets:
+        if batch:
+            print(f"\n📄 {target}")
+        try:
+            target_text = read_target(target)
+            infer(target_text, session=session, name=target)
+        except FileNotFoundError:
+            print(f"❌ File not found: {target}")
+        except Exception as e:
+            print(f"❌ Failed to process target: {e}")
+
+    if batch:
+        print("\n\n" + session.report())
 
 if __name__ == "__main__":
     main()
@@ -1,19 +1,354 @@
 import json
+import asyncio
+import contextvars
 import inspect
-from typing import Callable, Dict, Any
-from ollama import chat
+import math
+import re
+import sqlite3
+import threading
+import time
+import dataclasses
+import enum
+import types
+import typing
+from dataclasses import dataclass
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from typing import Callable, Dict, Any, List, Optional, Tuple, Union, Literal
+from ollama import chat, embeddings
+
+import tracing
+from patent_sections import estimate_tokens
 
 MODEL = 'llama3.1'
 DEBUG = True
+DEBUG_JSON = False  # also dump full response JSON each round (slow for large responses)
+TOOL_TIMEOUT = 30.0  # default per-call timeout in seconds
+TOOL_WORKERS = 8     # thread pool size for sync tools
+TOOL_CACHE_SIZE = 256  # default LRU size for @tool(cache=True)
+TOOL_TOP_K = 8         # schemas sent per turn once the registry outgrows this
+TOOL_SCORE_MARGIN = 1.5  # best score must beat the best left-out tool by this factor, else send all
+EMBED_MODEL = None     # e.g. 'nomic-embed-text' to blend local embeddings into ranking
+EMBED_WEIGHT = 4.0     # weight of cosine similarity relative to BM25
+MAX_TOOL_ROUNDS = 8          # tool-calling rounds before forcing a final answer
+CONTEXT_TOKEN_BUDGET = 6000  # estimated prompt tokens kept in `messages`
+TOOL_RESULT_TOKENS = 1000    # cap on a single tool result
+KEEP_RECENT_MESSAGES = 6     # newest messages never compacted
+
+# === Schema & Coercion ===
+_JSON_TYPES = {int: "integer", float: "number", bool: "boolean", str: "string"}
+_MISSING = inspect.Parameter.empty
+
+def _homogeneous(args) -> bool:
+    # list[X], set[X] and tuple[X, ...] share one item type
+    return len(args) == 1 or (len(args) == 2 and args[1] is Ellipsis)
+
+def _load_json(value):
+    # Models frequently send nested values as JSON strings
+    if isinstance(value, str):
+        return json.loads(value)
+    return value
+
+def _type_hints(obj) -> Dict[str, Any]:
+    try:
+        return typing.get_type_hints(obj)
+    except Exception:
+        return getattr(obj, "__annotations__", {})
+
+def schema_for(annotation) -> Dict[str, Any]:
+    """Translate a Python annotation into a JSON schema fragment."""
+    if annotation is _MISSING or annotation is Any:
+        return {"type": "string"}
+    if annotation in _JSON_TYPES:
+        return {"type": _JSON_TYPES[annotation]}
+
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+
+    if origin in (Union, types.UnionType):
+        members = [a for a in args if a is not type(None)]
+        if len(members) == 1:
+            return schema_for(members[0])
+        return {"anyOf": [schema_for(a) for a in members]}
+    if origin is Literal:
+        schema = {"enum": list(args)}
+        literal_types = {type(a) for a in args}
+        if len(literal_types) == 1 and literal_types.issubset(_JSON_TYPES):
+            schema["type"] = _JSON_TYPES[literal_types.pop()]
+        return schema
+    if annotation in (list, tuple, set) or origin in (list, tuple, set):
+        schema = {"type": "array"}
+        if _homogeneous(args):
+            schema["items"] = schema_for(args[0])
+        return schema
+    if annotation is dict or origin is dict:
+        schema = {"type": "object"}
+        if len(args) == 2:
+            schema["additionalProperties"] = schema_for(args[1])
+        return schema
+    if isinstance(annotation, type) and issubclass(annotation, enum.Enum):
+        values = [member.value for member in annotation]
+        schema = {"enum": values}
+        value_types = {type(v) for v in values}
+        if len(value_types) == 1 and value_types.issubset(_JSON_TYPES):
+            schema["type"] = _JSON_TYPES[value_types.pop()]
+        return schema
+    if dataclasses.is_dataclass(annotation):
+        hints = _type_hints(annotation)
+        fields = [f for f in dataclasses.fields(annotation) if f.init]
+        return {
+            "type": "object",
+            "properties": {f.name: schema_for(hints.get(f.name, _MISSING)) for f in fields},
+            "required": [
+                f.name for f in fields
+                if f.default is dataclasses.MISSING and f.default_factory is dataclasses.MISSING
+            ],
+        }
+    if typing.is_typeddict(annotation):
+        hints = _type_hints(annotation)
+        return {
+            "type": "object",
+            "properties": {name: schema_for(hint) for name, hint in hints.items()},
+            "required": sorted(annotation.__required_keys__),
+        }
+    return {"type": "string"}
+
+def _coerce_bool(value):
+    if isinstance(value, str):
+        lowered = value.strip().lower()
+        if lowered in ("true", "1", "yes", "y", "on"):
+            return True
+        if lowered in ("false", "0", "no", "n", "off", ""):
+            return False
+        raise ValueError(f"not a boolean: {value!r}")
+    return bool(value)
+
+def _identity(value):
+    return value
+
+def coercer_for(annotation) -> Callable[[Any], Any]:
+    """Build a function converting a model-supplied value to `annotation`."""
+    if annotation is _MISSING or annotation is Any:
+        return _identity
+    if annotation is bool:
+        return _coerce_bool
+    if annotation in _JSON_TYPES:
+        return annotation
+
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+
+    if origin in (Union, types.UnionType):
+        members = [a for a in args if a is not type(None)]
+        optional = len(members) != len(args)
+        member_coercers = [coercer_for(a) for a in members]
+
+        def coerce_union(value):
+            if value is None and optional:
+                return None
+            errors = []
+            for coerce in member_coercers:
+                try:
+                    return coerce(value)
+                except Exception as e:
+                    errors.append(str(e))
+            raise ValueError("; ".join(errors))
+        return coerce_union
+    if origin is Literal:
+        allowed = {str(a): a for a in args}
+
+        def coerce_literal(value):
+            if value in args:
+                return value
+            if str(value) in allowed:
+                return allowed[str(value)]
+            raise ValueError(f"{value!r} is not one of {list(args)}")
+        return coerce_literal
+    if annotation in (list, tuple, set) or origin in (list, tuple, set):
+        container = origin or annotation
+        item = coercer_for(args[0]) if _homogeneous(args) else _identity
+
+        def coerce_sequence(value):
+            value = _load_json(value)
+            if not isinstance(value, (list, tuple, set)):
+                value = [value]
+            return container(item(v) for v in value)
+        return coerce_sequence
+    if annotation is dict or origin is dict:
+        item = coercer_for(args[1]) if len(args) == 2 else _identity
+
+        def coerce_mapping(value):
+            value = _load_json(value)
+            if not isinstance(value, dict):
+                raise ValueError(f"expected an object, got {type(value).__name__}")
+            return {k: item(v) for k, v in value.items()}
+        return coerce_mapping
+    if isinstance(annotation, type) and issubclass(annotation, enum.Enum):
+        by_name = annotation.__members__
+
+        def coerce_enum(value):
+            if isinstance(value, annotation):
+                return value
+            if isinstance(value, str) and value in by_name:
+                return by_name[value]
+            return annotation(value)
+        return coerce_enum
+    if dataclasses.is_dataclass(annotation) or typing.is_typeddict(annotation):
+        hints = _type_hints(annotation)
+        field_coercers = {name: coercer_for(hint) for name, hint in hints.items()}
+        record_type = annotation if dataclasses.is_dataclass(annotation) else ()
+
+        def coerce_record(value):
+            value = _load_json(value)
+            if isinstance(value, record_type):
+                return value
+            if not isinstance(value, dict):
+                raise ValueError(f"expected an object, got {type(value).__name__}")
+            fields = {
+                k: field_coercers[k](v) if k in field_coercers else v
+                for k, v in value.items()
+            }
+            return annotation(**fields)
+        return coerce_record
+    if callable(annotation):
+        return annotation
+    return _identity
+
+# === Tool Result Cache ===
+class ToolCache:
+    """Bounded LRU of tool results with optional TTL and a shared SQLite tier.
+
+    The disk tier stores JSON only, so results that don't serialize stay in memory.
+    """
+
+    def __init__(self, tool_name: str, maxsize: int = TOOL_CACHE_SIZE,
+                 ttl: Optional[float] = None, path: Optional[str] = None):
+        self.tool_name = tool_name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS tool_cache ("
+                "tool TEXT, key TEXT, expires REAL, value TEXT, PRIMARY KEY (tool, key))"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(coerced_args: Dict[str, Any]) -> str:
+        return json.dumps(coerced_args, sort_keys=True, default=repr)
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._entries[key]
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT expires, value FROM tool_cache WHERE tool = ? AND key = ?",
+                        (self.tool_name, key),
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    # e.g. "database is locked" by another process: just a miss
+                    debug_print(f"[Tool cache read failed for {self.tool_name}: {e}]")
+                    row = None
+                if row and row[0] > now:
+                    value = json.loads(row[1])
+                    self._store(key, row[0], value)
+                    self.hits += 1
+                    return True, value
+
+            self.misses += 1
+            return False, None
+
+    def put(self, key: str, value: Any):
+        expires = time.time() + self.ttl if self.ttl is not None else float("inf")
+        with self._lock:
+            self._store(key, expires, value)
+            if self._db is not None:
+                try:
+                    encoded = json.dumps(value)
+                except (TypeError, ValueError):
+                    return
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO tool_cache VALUES (?, ?, ?, ?)",
+                        (self.tool_name, key, expires, encoded),
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    # The result is still cached in memory; only the shared copy is skipped
+                    debug_print(f"[Tool cache write skipped for {self.tool_name}: {e}]")
+                    self._db.rollback()
+
+    def _store(self, key: str, expires: float, value: Any):
+        self._entries[key] = (expires, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Optional[str] = None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+            if self._db is not None:
+                if key is None:
+                    self._db.execute("DELETE FROM tool_cache WHERE tool = ?", (self.tool_name,))
+                else:
+                    self._db.execute(
+                        "DELETE FROM tool_cache WHERE tool = ? AND key = ?", (self.tool_name, key)
+                    )
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+        }
 
 # === Tool Registry ===
+@dataclass
+class ToolPlan:
+    """Everything `handle_tool_call` needs, resolved once at registration."""
+    fn: Callable
+    # (name, coercer, default) per parameter; default is _MISSING when required
+    params: List[Tuple[str, Callable[[Any], Any], Any]]
+    is_async: bool = False
+    timeout: Optional[float] = None  # None falls back to TOOL_TIMEOUT
+    cache: Optional[ToolCache] = None
+
 tool_registry: Dict[str, Dict[str, Any]] = {}
 tool_functions: Dict[str, Callable] = {}
+tool_plans: Dict[str, ToolPlan] = {}
 
-def tool(description: str = ""):
+def tool(description: str = "", timeout: Optional[float] = None,
+         cache: Union[bool, int, str] = False, ttl: Optional[float] = None):
+    """Register `fn` as a tool.
+
+    cache: False (default) re-runs every call; True or an int max size memoizes
+    results in memory; a string is a SQLite path for a shared on-disk tier.
+    ttl: seconds before a cached result expires (None = until evicted).
+    """
     def decorator(fn: Callable):
         sig = inspect.signature(fn)
-        params = sig.parameters
+        hints = _type_hints(fn)
 
         # Build OpenAPI-style parameters schema
         param_schema = {
@@ -21,23 +356,17 @@ def tool(description: str = ""):
             "properties": {},
             "required": [],
         }
+        plan_params = []
+
+        for name, param in sig.parameters.items():
+            if param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+                continue
+            annotation = hints.get(name, param.annotation)
 
-        for name, param in params.items():
-            annotation = param.annotation
-            param_type = "string"  # default fallback
-
-            if annotation == int:
-                param_type = "integer"
-            elif annotation == float:
-                param_type = "number"
-            elif annotation == bool:
-                param_type = "boolean"
-            elif annotation == str:
-                param_type = "string"
-
-            param_schema["properties"][name] = {"type": param_type}
-            if param.default is inspect.Parameter.empty:
+            param_schema["properties"][name] = schema_for(annotation)
+            if param.default is _MISSING:
                 param_schema["required"].append(name)
+            plan_params.append((name, coercer_for(annotation), param.default))
 
         # Add tool to registry
         tool_registry[fn.__name__] = {
@@ -49,10 +378,132 @@ def tool(description: str = ""):
             }
         }
 
+        tool_cache = None
+        if cache is not False and cache is not None:
+            tool_cache = ToolCache(
+                fn.__name__,
+                maxsize=cache if type(cache) is int else TOOL_CACHE_SIZE,
+                ttl=ttl,
+                path=cache if isinstance(cache, str) else None,
+            )
+
+        global _tool_index
+        _tool_index = None  # rebuilt on the next select_tools()
+
         tool_functions[fn.__name__] = fn
+        tool_plans[fn.__name__] = ToolPlan(
+            fn=fn,
+            params=plan_params,
+            is_async=inspect.iscoroutinefunction(fn),
+            timeout=timeout,
+            cache=tool_cache,
+        )
         return fn
     return decorator
 
+# === Tool Selection ===
+_STOPWORDS = {"a", "an", "and", "the", "of", "to", "in", "is", "it", "for", "on", "by",
+              "with", "what", "how", "me", "my", "i", "you", "please", "can", "from"}
+
+def _terms(text: str) -> List[str]:
+    words = re.findall(r"[a-z0-9]+", re.sub(r"([a-z])([A-Z])", r"\1 \2", text).lower())
+    # Bare numbers are argument values ("9.5 minus 4"), not evidence for a tool
+    return [w for w in words if w not in _STOPWORDS and not w.isdigit()]
+
+class ToolIndex:
+    """BM25 index over tool names, descriptions and parameter names."""
+
+    K1 = 1.5
+    B = 0.75
+
+    def __init__(self, registry: Dict[str, Dict[str, Any]]):
+        self.names = list(registry)
+        self.schemas = [registry[name] for name in self.names]
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.lengths = []
+        self.vectors = None
+        self.tokens = [estimate_tokens(json.dumps(schema, default=str)) for schema in self.schemas]
+
+        for doc_id, schema in enumerate(self.schemas):
+            terms = _terms(self._document(schema))
+            self.lengths.append(len(terms))
+            counts: Dict[str, int] = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((doc_id, tf))
+
+        n_docs = len(self.schemas)
+        self.avg_length = sum(self.lengths) / n_docs if n_docs else 0.0
+        self.idf = {
+            term: math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    @staticmethod
+    def _document(schema: Dict[str, Any]) -> str:
+        function = schema["function"]
+        params = " ".join(function["parameters"].get("properties", {}))
+        return f"{function['name'].replace('_', ' ')} {function['description']} {params}"
+
+    def bm25(self, query: str) -> List[float]:
+        scores = [0.0] * len(self.schemas)
+        for term in set(_terms(query)):
+            for doc_id, tf in self.postings.get(term, ()):
+                norm = tf + self.K1 * (1 - self.B + self.B * self.lengths[doc_id] / self.avg_length)
+                scores[doc_id] += self.idf[term] * tf * (self.K1 + 1) / norm
+        return scores
+
+    def similarity(self, query: str) -> List[float]:
+        if self.vectors is None:
+            self.vectors = [_embed(self._document(s)) for s in self.schemas]
+        q = _embed(query)
+        return [sum(a * b for a, b in zip(q, v)) for v in self.vectors]
+
+    def rank(self, query: str) -> List[Tuple[float, int]]:
+        scores = self.bm25(query)
+        if EMBED_MODEL:
+            try:
+                for doc_id, sim in enumerate(self.similarity(query)):
+                    scores[doc_id] += EMBED_WEIGHT * sim
+            except Exception as e:
+                debug_print(f"[Embedding ranking unavailable: {e}]")
+        return sorted(((score, doc_id) for doc_id, score in enumerate(scores)), reverse=True)
+
+def _embed(text: str) -> List[float]:
+    vector = embeddings(model=EMBED_MODEL, prompt=text)["embedding"]
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+_tool_index: Optional[ToolIndex] = None
+
+def select_tools(query: str, k: int = None) -> List[Dict[str, Any]]:
+    """Return the top-k tool schemas for `query`, or the full registry when unsure."""
+    global _tool_index
+    k = k or TOOL_TOP_K
+    all_tools = list(tool_registry.values())
+    if len(all_tools) <= k:
+        return all_tools
+
+    if _tool_index is None:
+        _tool_index = ToolIndex(tool_registry)
+    ranked = _tool_index.rank(query)
+    # Trust the top k only when they clearly stand out from the tools left out
+    best, cutoff = ranked[0][0], ranked[k][0]
+    if best <= 0 or best < cutoff * TOOL_SCORE_MARGIN:
+        debug_print(f"[Tool selection: low confidence, sending all {len(all_tools)} tools]")
+        return all_tools
+
+    chosen = [doc_id for score, doc_id in ranked[:k] if score > 0]
+    selected = [_tool_index.schemas[doc_id] for doc_id in chosen]
+    full_tokens = sum(_tool_index.tokens)
+    sent_tokens = sum(_tool_index.tokens[doc_id] for doc_id in chosen)
+    debug_print(
+        f"[Tool selection: {len(selected)}/{len(all_tools)} tools, "
+        f"~{sent_tokens} of ~{full_tokens} schema tokens (saved ~{full_tokens - sent_tokens})]"
+    )
+    return selected
+
 # === Tool Functions ===
 @tool(description="Add two numbers together")
 def add_two_numbers(a: float, b: float) -> float:
@@ -72,33 +523,25 @@ def parse_tool_args(args):
         return json.loads(args)
     return args
 
-def handle_tool_call(tool_call):
-    tool_name = tool_call["function"]["name"]
-    raw_args = parse_tool_args(tool_call["function"]["arguments"])
-
-    if tool_name not in tool_functions:
-        raise ValueError(f"Unknown tool requested: {tool_name}")
-
-    fn = tool_functions[tool_name]
-    sig = inspect.signature(fn)
+def coerce_tool_args(plan: ToolPlan, raw_args: Dict[str, Any]) -> Dict[str, Any]:
     coerced_args = {}
-
-    for name, param in sig.parameters.items():
-        expected_type = param.annotation
-        value = raw_args.get(name)
-
-        if expected_type in [int, float, str, bool] and value is not None:
-            try:
-                coerced_args[name] = expected_type(value)
-            except Exception as e:
-                raise TypeError(f"Failed to coerce argument '{name}' to {expected_type}: {e}")
-        else:
-            coerced_args[name] = value
-
-    debug_print(f"\n[Model requested tool call: {tool_name} with args {coerced_args}]")
-    result = fn(**coerced_args)
-    debug_print(f"[Tool result: {result}]")
-
+    for name, coerce, default in plan.params:
+        if name not in raw_args:
+            if default is _MISSING:
+                raise TypeError(f"Missing required argument '{name}'")
+            coerced_args[name] = default
+            continue
+        value = raw_args[name]
+        if value is None:
+            coerced_args[name] = None
+            continue
+        try:
+            coerced_args[name] = coerce(value)
+        except Exception as e:
+            raise TypeError(f"Failed to coerce argument '{name}': {e}")
+    return coerced_args
+
+def tool_messages(tool_call, tool_name, result):
     assistant_msg = {
         "role": "assistant",
         "tool_calls": [tool_call]
@@ -107,7 +550,7 @@ def handle_tool_call(tool_call):
     tool_msg = {
         "role": "tool",
         "name": tool_name,
-        "content": str(result),
+        "content": truncate_text(str(result), TOOL_RESULT_TOKENS),
     }
 
     if "id" in tool_call:
@@ -117,8 +560,244 @@ def handle_tool_call(tool_call):
 
     return assistant_msg, tool_msg
 
+# === Tool Execution ===
+_executor: Optional[ThreadPoolExecutor] = None
+
+def _tool_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=TOOL_WORKERS, thread_name_prefix="tool")
+    return _executor
+
+def _run_tool(prepared: "PreparedCall"):
+    with tracing.span("tool.run", tool=prepared.tool_name) as sp:
+        result = prepared.plan.fn(**prepared.coerced_args)
+        if sp.recording:
+            sp.set(result_bytes=len(str(result)))
+    return result
+
+async def _run_async_tool(prepared: "PreparedCall"):
+    with tracing.span("tool.run", tool=prepared.tool_name) as sp:
+        result = await prepared.plan.fn(**prepared.coerced_args)
+        if sp.recording:
+            sp.set(result_bytes=len(str(result)))
+    return result
+
+def _submit_tool(prepared: "PreparedCall"):
+    # Worker threads don't inherit context vars; carry the trace over only when tracing
+    if tracing.enabled():
+        return _tool_executor().submit(contextvars.copy_context().run, _run_tool, prepared)
+    return _tool_executor().submit(_run_tool, prepared)
+
+async def _invoke_tool(prepared: "PreparedCall"):
+    if prepared.plan.is_async:
+        pending = _run_async_tool(prepared)
+    else:
+        pending = asyncio.wrap_future(_submit_tool(prepared))
+    return await asyncio.wait_for(pending, _timeout_for(prepared.plan))
+
+@dataclass
+class PreparedCall:
+    tool_call: Dict[str, Any]
+    tool_name: str
+    plan: ToolPlan
+    coerced_args: Dict[str, Any]
+    cache_key: Optional[str] = None
+    messages: Optional[Tuple[Dict[str, Any], Dict[str, Any]]] = None  # set on a cache hit
+
+def prepare_tool_call(tool_call) -> PreparedCall:
+    tool_name = tool_call["function"]["name"]
+    raw_args = parse_tool_args(tool_call["function"]["arguments"]) or {}
+
+    plan = tool_plans.get(tool_name)
+    if plan is None:
+        raise ValueError(f"Unknown tool requested: {tool_name}")
+
+    with tracing.span("tool.coerce", tool=tool_name):
+        prepared = PreparedCall(tool_call, tool_name, plan, coerce_tool_args(plan, raw_args))
+    if DEBUG:
+        debug_print(f"\n[Model requested tool call: {tool_name} with args {prepared.coerced_args}]")
+
+    # Cache hits are answered here, without touching the event loop
+    if plan.cache is not None:
+        prepared.cache_key = ToolCache.make_key(prepared.coerced_args)
+        hit, result = plan.cache.get(prepared.cache_key)
+        if hit:
+            if DEBUG:
+                debug_print(f"[Tool result (cached): {result}]")
+            prepared.messages = tool_messages(tool_call, tool_name, result)
+    return prepared
+
+def _timeout_for(plan: ToolPlan) -> float:
+    return plan.timeout if plan.timeout is not None else TOOL_TIMEOUT
+
+def finish_tool_call(prepared: PreparedCall, result, timed_out: bool = False):
+    if timed_out:
+        result = f"Error: tool '{prepared.tool_name}' timed out after {_timeout_for(prepared.plan)}s"
+    elif prepared.plan.cache is not None:
+        prepared.plan.cache.put(prepared.cache_key, result)
+    if DEBUG:
+        debug_print(f"[Tool result: {result}]")
+
+    prepared.messages = tool_messages(prepared.tool_call, prepared.tool_name, result)
+    return prepared.messages
+
+async def execute_tool_call(prepared: PreparedCall):
+    if prepared.messages is not None:
+        return prepared.messages
+    try:
+        result = await _invoke_tool(prepared)
+    except asyncio.TimeoutError:
+        return finish_tool_call(prepared, None, timed_out=True)
+    return finish_tool_call(prepared, result)
+
+def _run_sync_calls(prepared_calls: List[PreparedCall]):
+    # Sync-only turns skip the event loop and wait on pool futures directly;
+    # a timed-out tool keeps its worker thread until it returns.
+    started = time.monotonic()
+    futures = [_submit_tool(p) for p in prepared_calls]
+    for prepared, future in zip(prepared_calls, futures):
+        remaining = max(started + _timeout_for(prepared.plan) - time.monotonic(), 0)
+        try:
+            result = future.result(timeout=remaining)
+        except FuturesTimeoutError:
+            finish_tool_call(prepared, None, timed_out=True)
+        else:
+            finish_tool_call(prepared, result)
+
+async def handle_tool_call_async(tool_call):
+    return await execute_tool_call(prepare_tool_call(tool_call))
+
+def handle_tool_call(tool_call):
+    return dispatch_tool_calls([tool_call])[0]
+
+async def _gather_tool_calls(prepared_calls):
+    return await asyncio.gather(*(execute_tool_call(p) for p in prepared_calls))
+
+def dispatch_tool_calls(tool_calls):
+    """Run independent tool calls concurrently, returning results in request order."""
+    with tracing.span("tool.dispatch", calls=len(tool_calls)) as sp:
+        prepared_calls = [prepare_tool_call(tc) for tc in tool_calls]
+        pending = [p for p in prepared_calls if p.messages is None]
+        sp.set(cached=len(prepared_calls) - len(pending))
+        if any(p.plan.is_async for p in pending):
+            asyncio.run(_gather_tool_calls(pending))
+        elif pending:
+            _run_sync_calls(pending)
+    return [p.messages for p in prepared_calls]
+
+def invalidate_tool_cache(tool_name: Optional[str] = None, args: Optional[Dict[str, Any]] = None):
+    """Drop cached results for one call, one tool, or every cached tool."""
+    names = [tool_name] if tool_name else list(tool_plans)
+    for name in names:
+        plan = tool_plans[name]
+        if plan.cache is None:
+            continue
+        key = ToolCache.make_key(coerce_tool_args(plan, args)) if args is not None else None
+        plan.cache.invalidate(key)
+
+def tool_cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: plan.cache.stats() for name, plan in tool_plans.items() if plan.cache is not None}
+
+# === Context Budget ===
+SUMMARY_HEADER = "Summary of earlier tool activity:"
+
+def truncate_text(text: str, max_tokens: int) -> str:
+    """Keep the head and tail of `text` within roughly `max_tokens`."""
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    keep = max_chars // 2
+    return f"{text[:keep]}\n[... {len(text) - 2 * keep} chars truncated ...]\n{text[-keep:]}"
+
+def _summary_line(msg: Dict[str, Any]) -> str:
+    if msg.get("tool_calls"):
+        calls = ", ".join(
+            f"{tc['function']['name']}({parse_tool_args(tc['function']['arguments'])})"
+            for tc in msg["tool_calls"]
+        )
+        return truncate_text(f"- called {calls}", 30)
+    if msg["role"] == "tool":
+        return truncate_text(f"- {msg.get('name', 'tool')} returned {msg['content']}", 30)
+    return truncate_text(f"- {msg['role']}: {msg.get('content', '')}", 30)
+
+def compact_messages(messages: List[Dict[str, Any]], budget: int = CONTEXT_TOKEN_BUDGET):
+    """Shrink `messages` in place to fit `budget`.
+
+    The leading system/user prompt and the newest KEEP_RECENT_MESSAGES stay
+    intact; older tool output is truncated first, then the oldest messages are
+    folded into a one-line-per-message summary.
+    """
+    sizes = [estimate_tokens(json.dumps(m, default=str)) for m in messages]
+    if sum(sizes) <= budget:
+        return messages
+
+    pinned = next((i + 1 for i, m in enumerate(messages) if m["role"] == "user"), 1)
+    has_summary = len(messages) > pinned and messages[pinned].get("content", "").startswith(SUMMARY_HEADER)
+    start = pinned + 1 if has_summary else pinned
+    stop = max(len(messages) - KEEP_RECENT_MESSAGES, start)
+
+    for i in range(start, stop):
+        if messages[i]["role"] == "tool" and sizes[i] > 64:
+            messages[i] = dict(messages[i], content=truncate_text(messages[i]["content"], 48))
+            sizes[i] = estimate_tokens(json.dumps(messages[i], default=str))
+
+    lines = messages[pinned]["content"].splitlines()[1:] if has_summary else []
+    folded = start
+    while sum(sizes) > budget and folded < stop:
+        group_end = folded + 1
+        if messages[folded].get("tool_calls"):
+            # Fold a call together with all its replies, so no tool message is left orphaned
+            while group_end < len(messages) and messages[group_end]["role"] == "tool":
+                group_end += 1
+        for i in range(folded, group_end):
+            lines.append(_summary_line(messages[i]))
+            sizes[i] = 0
+        folded = group_end
+    if folded == start:
+        return messages
+
+    summary = {"role": "system", "content": "\n".join([SUMMARY_HEADER] + lines[-40:])}
+    messages[pinned:folded] = [summary]
+    return messages
+
 # === Conversation Loop ===
-def run_conversation(user_input):
+def traced_chat(**kwargs):
+    """`chat` wrapped in a span recording token counts and payload sizes."""
+    with tracing.span("chat", model=kwargs.get("model"), tools=len(kwargs.get("tools") or ())) as sp:
+        response = chat(**kwargs)
+        if sp.recording:
+            sp.set(
+                messages=len(kwargs["messages"]),
+                request_bytes=tracing.payload_size(kwargs["messages"]),
+                tool_bytes=tracing.payload_size(kwargs.get("tools") or []),
+                response_bytes=len(response["message"].get("content") or ""),
+                prompt_eval_count=response.get("prompt_eval_count"),
+                eval_count=response.get("eval_count"),
+                load_duration=response.get("load_duration"),
+                prompt_eval_duration=response.get("prompt_eval_duration"),
+                eval_duration=response.get("eval_duration"),
+            )
+    return response
+
+def _debug_response(label, response):
+    if not DEBUG:
+        return
+    if DEBUG_JSON:
+        debug_print(f"\n[{label} JSON]")
+        debug_print(json.dumps(response, indent=2, default=str))
+        return
+    message = response["message"]
+    debug_print(
+        f"\n[{label}: {len(message.get('tool_calls') or [])} tool calls, "
+        f"{response.get('prompt_eval_count')} prompt / {response.get('eval_count')} eval tokens]"
+    )
+
+def run_conversation(user_input, max_rounds: int = MAX_TOOL_ROUNDS):
+    with tracing.span("conversation", model=MODEL, max_rounds=max_rounds):
+        return _run_conversation(user_input, max_rounds)
+
+def _run_conversation(user_input, max_rounds):
     messages = [
         {
             "role": "system",
@@ -129,40 +808,43 @@ def run_conversation(user_input):
         },
         {"role": "user", "content": user_input}
     ]
-
-    # First model call with tools
-    response = chat(
-        model=MODEL,
-        messages=messages,
-        tools=list(tool_registry.values())
-    )
-
-    debug_print("\n[Initial response JSON]")
-    debug_print(json.dumps(response, indent=2))
-
-    tool_calls = response["message"].get("tool_calls", [])
-
-    if not tool_calls:
-        debug_print("\n[No tool calls from model]")
-        print(f"\n🧠 Model Response: {response['message']['content']}")
-        return
-
-    # Process all tool calls
-    for tool_call in tool_calls:
-        assistant_msg, tool_msg = handle_tool_call(tool_call)
-        messages.append(assistant_msg)
-        messages.append(tool_msg)
-
-    # Send back to model for final answer
-    final_response = chat(
+    with tracing.span("tool.select") as sp:
+        tools = select_tools(user_input)
+        sp.set(selected=len(tools), registry=len(tool_registry))
+
+    # Keep calling tools until the model answers or the round limit is hit
+    for round_no in range(max_rounds):
+        response = traced_chat(
+            model=MODEL,
+            messages=compact_messages(messages),
+            tools=tools
+        )
+        _debug_response(f"Round {round_no + 1} response", response)
+
+        tool_calls = response["message"].get("tool_calls", [])
+
+        if not tool_calls:
+            if round_no == 0:
+                debug_print("\n[No tool calls from model]")
+                print(f"\n🧠 Model Response: {response['message']['content']}")
+            else:
+                print(f"\n✅ Answer: {response['message']['content']}")
+            return response['message']['content']
+
+        # Process all tool calls concurrently; results keep the model's order
+        for assistant_msg, tool_msg in dispatch_tool_calls(tool_calls):
+            messages.append(assistant_msg)
+            messages.append(tool_msg)
+
+    # Out of rounds: ask for an answer without offering tools
+    final_response = traced_chat(
         model=MODEL,
-        messages=messages
+        messages=compact_messages(messages)
     )
-
-    debug_print("\n[Final response JSON]")
-    debug_print(json.dumps(final_response, indent=2))
+    _debug_response("Final response", final_response)
 
     print(f"\n✅ Answer: {final_response['message']['content']}")
+    return final_response['message']['content']
 
 # === Run ===
 if __name__ == "__main__":
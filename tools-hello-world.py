@@ -1,9 +1,18 @@
 import json
+import asyncio
+import contextvars
+import inspect
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
 from ollama import chat
 
+import tracing
+
 # Use a model that supports tools
 MODEL = 'llama3.1'
 DEBUG = True
+DEBUG_JSON = False  # also dump full response JSON (slow for large responses)
+TOOL_TIMEOUT = 30.0  # seconds, unless overridden in tool_timeouts
 
 # === Tool Functions ===
 def add_two_numbers(a: float, b: float) -> float:
@@ -52,6 +61,9 @@ tool_functions = {
     "subtract_two_numbers": subtract_two_numbers,
 }
 
+# Per-tool timeout overrides in seconds
+tool_timeouts = {}
+
 # === Helpers ===
 def debug_print(*args, **kwargs):
     if DEBUG:
@@ -62,17 +74,7 @@ def parse_tool_args(args):
         return json.loads(args)
     return args
 
-def handle_tool_call(tool_call):
-    tool_name = tool_call["function"]["name"]
-    args = parse_tool_args(tool_call["function"]["arguments"])
-    debug_print(f"\n[Model requested tool call: {tool_name} with args {args}]")
-
-    if tool_name not in tool_functions:
-        raise ValueError(f"Unknown tool requested: {tool_name}")
-
-    result = tool_functions[tool_name](**args)
-    debug_print(f"[Tool result: {result}]")
-
+def tool_messages(tool_call, tool_name, result):
     # Return the assistant's tool call message and the tool's response message
     assistant_msg = {
         "role": "assistant",
@@ -92,7 +94,74 @@ def handle_tool_call(tool_call):
 
     return assistant_msg, tool_msg
 
+def handle_tool_call(tool_call):
+    tool_name = tool_call["function"]["name"]
+    with tracing.span("tool.coerce", tool=tool_name):
+        args = parse_tool_args(tool_call["function"]["arguments"])
+    if DEBUG:
+        debug_print(f"\n[Model requested tool call: {tool_name} with args {args}]")
+
+    if tool_name not in tool_functions:
+        raise ValueError(f"Unknown tool requested: {tool_name}")
+
+    with tracing.span("tool.run", tool=tool_name):
+        result = tool_functions[tool_name](**args)
+        # async def tools run to completion on this worker thread
+        if inspect.isawaitable(result):
+            result = asyncio.run(result)
+    if DEBUG:
+        debug_print(f"[Tool result: {result}]")
+
+    return tool_messages(tool_call, tool_name, result)
+
+def dispatch_tool_calls(tool_calls):
+    """Run independent tool calls on a thread pool, returning results in request order."""
+    pool = ThreadPoolExecutor(max_workers=max(len(tool_calls), 1))
+    started = time.monotonic()
+    # copy_context carries the current trace span into the worker threads
+    futures = [
+        pool.submit(contextvars.copy_context().run, handle_tool_call, tool_call)
+        for tool_call in tool_calls
+    ]
+
+    results = []
+    for tool_call, future in zip(tool_calls, futures):
+        tool_name = tool_call["function"]["name"]
+        timeout = tool_timeouts.get(tool_name, TOOL_TIMEOUT)
+        remaining = max(started + timeout - time.monotonic(), 0)
+        try:
+            results.append(future.result(timeout=remaining))
+        except TimeoutError:
+            results.append(tool_messages(tool_call, tool_name, f"Error: tool '{tool_name}' timed out after {timeout}s"))
+
+    # Don't block the turn on tools that overran their timeout
+    pool.shutdown(wait=False, cancel_futures=True)
+    return results
+
+def traced_chat(**kwargs):
+    with tracing.span("chat", model=kwargs.get("model"), tools=len(kwargs.get("tools") or ())) as sp:
+        response = chat(**kwargs)
+        if sp.recording:
+            sp.set(
+                request_bytes=tracing.payload_size(kwargs["messages"]),
+                response_bytes=len(response["message"].get("content") or ""),
+                prompt_eval_count=response.get("prompt_eval_count"),
+                eval_count=response.get("eval_count"),
+            )
+    return response
+
+def debug_response(label, response):
+    if DEBUG and DEBUG_JSON:
+        debug_print(f"\n[{label} JSON]")
+        debug_print(json.dumps(response, indent=2))
+    elif DEBUG:
+        debug_print(f"\n[{label}: {response.get('prompt_eval_count')} prompt / {response.get('eval_count')} eval tokens]")
+
 def run_conversation(user_input):
+    with tracing.span("conversation", model=MODEL):
+        _run_conversation(user_input)
+
+def _run_conversation(user_input):
     messages = [
         {
             "role": "system",
@@ -105,14 +174,12 @@ def run_conversation(user_input):
     ]
 
     # First model call with tools
-    response = chat(
+    response = traced_chat(
         model=MODEL,
         messages=messages,
         tools=tools
     )
-
-    debug_print("\n[Initial response JSON]")
-    debug_print(json.dumps(response, indent=2))
+    debug_response("Initial response", response)
 
     tool_calls = response["message"].get("tool_calls", [])
 
@@ -121,20 +188,19 @@ def run_conversation(user_input):
         print(f"\n🧠 Model Response: {response['message']['content']}")
         return
 
-    # Process all tool calls and collect messages
-    for tool_call in tool_calls:
-        assistant_msg, tool_msg = handle_tool_call(tool_call)
+    # Process all tool calls concurrently and collect messages in order
+    with tracing.span("tool.dispatch", calls=len(tool_calls)):
+        results = dispatch_tool_calls(tool_calls)
+    for assistant_msg, tool_msg in results:
         messages.append(assistant_msg)
         messages.append(tool_msg)
 
     # Send final message to model with tool results
-    final_response = chat(
+    final_response = traced_chat(
         model=MODEL,
         messages=messages
     )
-
-    debug_print("\n[Final response JSON]")
-    debug_print(json.dumps(final_response, indent=2))
+    debug_response("Final response", final_response)
 
     print(f"\n✅ Answer: {final_response['message']['content']}")
 
@@ -0,0 +1,181 @@
+__code_desc__ = "Low-overhead span tracing for the LLM scripts"
+__code_version__ = 'v0.0.1'
+__code_debug__ = False
+
+## Standard Libraries
+import atexit
+import contextvars
+import itertools
+import json
+import os
+import random
+import threading
+import time
+
+# Tracing is off unless configured, either in code or through the environment:
+#   LLM_TRACE=trace.jsonl        one JSON object per span
+#   LLM_TRACE=trace.json         Chrome trace format (chrome://tracing, Perfetto)
+#   LLM_TRACE_SAMPLE=0.1         fraction of root spans (and their children) recorded
+_enabled = False
+_sample_rate = 1.0
+_path = None
+_format = "jsonl"
+_events = []
+_lock = threading.Lock()
+_ids = itertools.count(1)
+_flush_every = 512
+
+# (trace_id, span_id, sampled) of the innermost open span
+_current = contextvars.ContextVar("trace_span", default=None)
+
+# perf_counter is monotonic but has an arbitrary origin; anchor it to wall time
+_EPOCH_US = time.time() * 1e6 - time.perf_counter() * 1e6
+
+
+def configure(path=None, sample_rate=1.0, fmt=None):
+    """Enable tracing to `path`; fmt is "jsonl" or "chrome" (default: from the extension)."""
+    global _enabled, _sample_rate, _path, _format, _events
+    flush()
+    _events = []
+    _path = path
+    _sample_rate = sample_rate
+    _format = fmt or ("chrome" if path and path.endswith(".json") else "jsonl")
+    _enabled = bool(path)
+
+
+def enabled():
+    return _enabled
+
+
+class _NoopSpan:
+    recording = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    recording = True
+    __slots__ = ("name", "attrs", "trace_id", "span_id", "parent_id", "start", "_token")
+
+    def __init__(self, name, attrs, trace_id, parent_id):
+        self.name = name
+        self.attrs = attrs
+        self.trace_id = trace_id
+        self.span_id = next(_ids)
+        self.parent_id = parent_id
+
+    def __enter__(self):
+        self._token = _current.set((self.trace_id, self.span_id, True))
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        _current.reset(self._token)
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        _record({
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "ts": _EPOCH_US + self.start * 1e6,
+            "dur": (end - self.start) * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "attrs": self.attrs,
+        })
+        return False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+class _UnsampledSpan(_NoopSpan):
+    """Marks a root that lost the sampling draw so its children skip recording too."""
+    __slots__ = ("_token",)
+
+    def __enter__(self):
+        self._token = _current.set((None, None, False))
+        return self
+
+    def __exit__(self, *exc):
+        _current.reset(self._token)
+        return False
+
+
+def span(name, **attrs):
+    """Context manager timing a block; a shared no-op when tracing is disabled."""
+    if not _enabled:
+        return _NOOP
+    parent = _current.get()
+    if parent is None:
+        if _sample_rate < 1.0 and random.random() >= _sample_rate:
+            return _UnsampledSpan()
+        return Span(name, attrs, next(_ids), None)
+    trace_id, parent_id, sampled = parent
+    if not sampled:
+        return _NOOP
+    return Span(name, attrs, trace_id, parent_id)
+
+
+def payload_size(obj):
+    """Approximate serialized size in bytes, for span attributes."""
+    try:
+        return len(json.dumps(obj, default=str))
+    except (TypeError, ValueError):
+        return len(str(obj))
+
+
+def _record(event):
+    with _lock:
+        _events.append(event)
+        full = _format == "jsonl" and len(_events) >= _flush_every
+    if full:
+        flush()
+
+
+def flush():
+    """Write buffered spans. JSONL appends; Chrome format rewrites the whole file."""
+    global _events
+    if not _path:
+        return
+    with _lock:
+        if _format == "jsonl":
+            pending, _events = _events, []
+            if not pending:
+                return
+            with open(_path, "a", encoding="utf-8") as f:
+                for event in pending:
+                    f.write(json.dumps(event, default=str) + "\n")
+        else:
+            trace_events = [
+                {
+                    "name": e["name"],
+                    "ph": "X",
+                    "ts": round(e["ts"], 3),
+                    "dur": round(e["dur"], 3),
+                    "pid": e["pid"],
+                    "tid": e["tid"],
+                    "args": dict(e["attrs"], trace_id=e["trace_id"]),
+                }
+                for e in _events
+            ]
+            with open(_path, "w", encoding="utf-8") as f:
+                json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, f, default=str)
+
+
+atexit.register(flush)
+
+if os.getenv("LLM_TRACE"):
+    configure(os.environ["LLM_TRACE"], float(os.getenv("LLM_TRACE_SAMPLE", "1.0")))